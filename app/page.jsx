@@ -12,6 +12,13 @@ const LOTTIE_HERO =
 const LOTTIE_CONFETTI =
   "https://assets2.lottiefiles.com/packages/lf20_hbr24nzz.json";
 
+// prefer the backend's cached thumbnail over hot-linking the retailer CDN
+function productImage(p) {
+  if (!p) return null;
+  if (p.thumbnail) return `${API}${p.thumbnail}`;
+  return p.image || null;
+}
+
 function parsePriceToNumber(str) {
   if (!str) return null;
   const s = String(str).replace(/,/g, "");
@@ -936,7 +943,7 @@ export default function DealScopePage() {
                 <img
                   className="prod-img"
                   src={
-                    p.image ||
+                    productImage(p) ||
                     "https://images.pexels.com/photos/5632396/pexels-photo-5632396.jpeg?auto=compress&cs=tinysrgb&w=600"
                   }
                   alt={p.title}
@@ -1167,7 +1174,7 @@ export default function DealScopePage() {
                     <img
                       className="prod-img"
                       src={
-                        p.image ||
+                        productImage(p) ||
                         "https://images.pexels.com/photos/5632389/pexels-photo-5632389.jpeg?auto=compress&cs=tinysrgb&w=600"
                       }
                       alt={p.title}
@@ -1303,7 +1310,7 @@ export default function DealScopePage() {
               <div style={{ flex: 1, minWidth: 220 }}>
                 <img
                   src={
-                    watching.image ||
+                    productImage(watching) ||
                     "https://images.pexels.com/photos/5632389/pexels-photo-5632389.jpeg?auto=compress&cs=tinysrgb&w=600"
                   }
                   alt={watching.title || watching.name}
@@ -1,4 +1,4 @@
-from flask import Flask, request, jsonify
+from flask import Flask, request, jsonify, send_file
 from flask_cors import CORS
 import asyncio
 import traceback
@@ -12,7 +12,14 @@ import json
 import uuid
 from datetime import datetime
 
-from scrapers import scrape_amazon, scrape_flipkart, scrape_nykaa
+from sites import available_sites, loaded_sites, run_site
+from image_proxy import ImageProxyError, get_image_proxy, proxied_image_path
+from session_state import session_store, warm_up, SITE_HOMEPAGES
+from navigation import navigation_status, breaker_for
+from memory import last_reports as memory_reports
+from records import product_dict
+from delivery import get_outbox, get_worker, triggered_entries
+from html_archive import get_archive
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
@@ -46,50 +53,26 @@ def run_in_new_loop(coro_factory: Callable[[], Awaitable]):
 def normalize_row(row):
     if not row:
         return None
-
-    try:
-        d = dict(row)
-    except:
-        try:
-            d = row.to_dict()
-        except:
-            d = {}
-
-    title = d.get("Title") or d.get("title") or ""
-    price = d.get("Price") or d.get("price") or ""
-    orig = d.get("OriginalPrice") or d.get("original_price") or d.get("Original Price") or ""
-    url = d.get("URL") or d.get("Product Link") or d.get("link") or d.get("url")
-
-    # ✅ keep image field from scrapers
-    image = d.get("image") or d.get("img") or d.get("thumbnail")
-
-    # discount parsing
-    dp = d.get("DiscountPercent") or d.get("discount_percent") or d.get("discount")
-
-    dp_num = None
-    if isinstance(dp, (int, float)):
-        dp_num = float(dp)
-    else:
-        try:
-            m = re.search(r"(\d+(\.\d+)?)", str(dp))
-            if m:
-                dp_num = float(m.group(1))
-        except:
-            dp_num = None
-
-    site = (d.get("site") or "").lower()
-    discount_source = d.get("DiscountSource") or d.get("discount_source")
-
-    return {
-        "site": site,
-        "title": title,
-        "price_text": price,
-        "original_price_text": orig,
-        "discount_percent": dp_num,
-        "discount_source": discount_source,
-        "url": url,
-        "image": image,  # 👈 this is what the frontend reads
-    }
+    # ✅ keeps the image field from scrapers (what the frontend reads) plus a cached thumbnail path
+    return product_dict(row, thumbnail_fn=proxied_image_path)
+
+
+def requested_sites(value, known):
+    """
+    Site names from a request's `sites` field: a list or a comma-separated
+    string, each site once in request order; all of `known` when empty.
+    Raises ValueError for anything else or for unknown names.
+    """
+    site_names = value or known
+    if isinstance(site_names, str):
+        site_names = [s.strip() for s in site_names.split(",") if s.strip()]
+    if not isinstance(site_names, list) or not all(isinstance(s, str) for s in site_names):
+        raise ValueError("sites must be a list or a comma-separated string of site names")
+    site_names = list(dict.fromkeys(site_names))
+    unknown = [s for s in site_names if s not in known]
+    if unknown:
+        raise ValueError(f"unknown sites: {unknown}")
+    return site_names
 
 
 # ------------------------------------------------------
@@ -155,11 +138,17 @@ def api_scrape():
 
         logger.info("Incoming /api/scrape payload: %r", payload)
 
+        try:
+            site_names = requested_sites(payload.get("sites"), available_sites())
+        except ValueError as e:
+            return jsonify({"success": False, "error": str(e)}), 400
+
+        site_stats = {s: {} for s in site_names}
+
         def factory():
             return asyncio.gather(
-                scrape_amazon(keyword=keyword, max_products=max_products),
-                scrape_flipkart(keyword=keyword, max_products=max_products),
-                scrape_nykaa(keyword=keyword, max_products=max_products),
+                *(run_site(s, keyword=keyword, max_products=max_products, stats=site_stats[s])
+                  for s in site_names),
                 return_exceptions=True,
             )
 
@@ -167,7 +156,6 @@ def api_scrape():
 
         combined = []
         site_errors = {}
-        site_names = ["amazon", "flipkart", "nykaa"]
 
         for site_name, res in zip(site_names, gathered):
             if isinstance(res, Exception):
@@ -181,6 +169,15 @@ def api_scrape():
                         nr["site"] = site_name
                     combined.append(nr)
 
+        # queue notifications for alerts this scrape triggered
+        try:
+            entries = triggered_entries(load_alerts(), keyword, combined)
+            if entries:
+                queued = get_outbox().enqueue(entries)
+                logger.info("Queued %d alert notifications (%d matched)", queued, len(entries))
+        except Exception:
+            logger.error("Failed to queue alert notifications\n%s", traceback.format_exc())
+
         # ------------------------------------------------------
         # SIMPLE DISCOUNT FILTER:
         # Expect payload["discount"] = 30 (or "30" or "30%")
@@ -210,8 +207,10 @@ def api_scrape():
         return jsonify({
             "success": True,
             "keyword": keyword,
+            "sites": site_names,
             "count_all": len(combined),
             "site_errors": site_errors,
+            "site_stats": site_stats,
             "items": combined
         })
 
@@ -246,6 +245,7 @@ def api_subscribe():
             "method": method,
             "contact": contact,
             "product_title": product.get("title") or product.get("name") or keyword,
+            "product_id": product.get("id"),
             "product_url": product.get("url"),
             "site": product.get("site"),
             "created_at": datetime.utcnow().isoformat() + "Z"
@@ -297,8 +297,148 @@ def api_delete_alert():
         return jsonify({"success": False, "error": str(e)}), 500
 
 
+# ------------------------------------------------------
+# IMAGE PROXY: cached thumbnails of retailer images
+# ------------------------------------------------------
+@app.route("/api/image", methods=["GET"])
+def api_image():
+    url = request.args.get("url", "")
+    width = request.args.get("w")
+    # a blob can be evicted between lookup and send; the second pass re-fetches it
+    for attempt in range(2):
+        try:
+            path, mimetype, digest = get_image_proxy().get(url, width)
+        except ImageProxyError as e:
+            logger.info("Image proxy refused %r: %s", url, e)
+            return jsonify({"success": False, "error": str(e)}), e.status
+        except Exception as e:
+            logger.error("Image proxy error: %s", traceback.format_exc())
+            return jsonify({"success": False, "error": str(e)}), 500
+
+        try:
+            resp = send_file(path, mimetype=mimetype, etag=digest, conditional=True, max_age=31536000)
+        except FileNotFoundError:
+            if attempt:
+                return jsonify({"success": False, "error": "cached image disappeared"}), 503
+            continue
+        resp.headers["Cache-Control"] = "public, max-age=31536000, immutable"
+        return resp
+
+
+@app.route("/api/image/stats", methods=["GET"])
+def api_image_stats():
+    proxy = get_image_proxy()
+    return jsonify({
+        "success": True,
+        "stats": proxy.stats_snapshot(),
+        "cache_bytes": proxy.cache.total_bytes,
+        "cache_max_bytes": proxy.cache.max_bytes,
+    })
+
+
+# ------------------------------------------------------
+# OUTBOX: alert notification delivery
+# ------------------------------------------------------
+@app.route("/api/outbox", methods=["GET"])
+def api_outbox():
+    worker = get_worker()
+    return jsonify({
+        "success": True,
+        "outbox": get_outbox().stats(),
+        "worker": worker.throughput() if worker else None,
+    })
+
+
+@app.route("/api/outbox/requeue-dead", methods=["POST"])
+def api_outbox_requeue():
+    return jsonify({"success": True, "requeued": get_outbox().requeue_dead()})
+
+
+# ------------------------------------------------------
+# SESSIONS: persisted per-site browser state
+# ------------------------------------------------------
+@app.route("/api/sessions", methods=["GET"])
+def api_sessions():
+    return jsonify({"success": True, "sessions": session_store.stats()})
+
+
+@app.route("/api/sessions/warmup", methods=["POST"])
+def api_sessions_warmup():
+    try:
+        payload = request.get_json(force=True, silent=True) or {}
+        try:
+            sites = requested_sites(payload.get("sites"), list(SITE_HOMEPAGES))
+        except ValueError as e:
+            return jsonify({"success": False, "error": str(e)}), 400
+        headless = bool(payload.get("headless", True))
+
+        def factory():
+            return asyncio.gather(
+                *(warm_up(s, headless=headless) for s in sites), return_exceptions=True
+            )
+
+        gathered = run_in_new_loop(factory)
+        result = {}
+        for site_name, res in zip(sites, gathered):
+            result[site_name] = {"error": str(res)} if isinstance(res, Exception) else res
+        return jsonify({"success": True, "sessions": result})
+    except Exception as e:
+        logger.error("Warm-up error: %s", traceback.format_exc())
+        return jsonify({"success": False, "error": str(e)}), 500
+
+
+@app.route("/api/sessions/<site>", methods=["DELETE"])
+def api_sessions_invalidate(site):
+    if site not in SITE_HOMEPAGES:
+        return jsonify({"success": False, "error": "unknown site"}), 404
+    session_store.invalidate(site, reason="requested via API")
+    return jsonify({"success": True})
+
+
+# ------------------------------------------------------
+# SITES: registry
+# ------------------------------------------------------
+@app.route("/api/sites", methods=["GET"])
+def api_sites():
+    return jsonify({"success": True, "sites": available_sites(), "loaded": loaded_sites()})
+
+
+# ------------------------------------------------------
+# NAVIGATION: per-site circuit breakers + latency
+# ------------------------------------------------------
+@app.route("/api/breakers", methods=["GET"])
+def api_breakers():
+    return jsonify({"success": True, "sites": navigation_status()})
+
+
+@app.route("/api/breakers/<site>/reset", methods=["POST"])
+def api_breaker_reset(site):
+    # only keys that already exist (e.g. "nykaa:detail") or real sites; breaker_for
+    # would otherwise register a new breaker for any string in the URL
+    if site not in navigation_status() and site not in available_sites():
+        return jsonify({"success": False, "error": "unknown site"}), 404
+    breaker_for(site).reset()
+    return jsonify({"success": True, "breaker": breaker_for(site).snapshot()})
+
+
+# ------------------------------------------------------
+# MEMORY: last per-site scrape report
+# ------------------------------------------------------
+@app.route("/api/memory", methods=["GET"])
+def api_memory():
+    return jsonify({"success": True, "reports": memory_reports()})
+
+
+@app.route("/api/archive", methods=["GET"])
+def api_archive():
+    return jsonify({"success": True, "archive": get_archive().stats()})
+
+
 # ------------------------------------------------------
 # Run server
 # ------------------------------------------------------
 if __name__ == "__main__":
+    # open the outbox now so rows left pending/sending by the last run are delivered
+    # without waiting for the next alert to trigger
+    get_outbox()
     app.run(host="0.0.0.0", port=5000, debug=False)
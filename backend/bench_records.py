@@ -0,0 +1,152 @@
+# bench_records.py
+"""
+Per-row vs. batch normalization benchmark.
+
+    python bench_records.py                 # 200k rows
+    python bench_records.py 500000 --json
+
+Compares, on synthetic scraper rows:
+  - legacy:        the pre-records normalize_row (no thumbnail path), as a baseline
+  - normalize_row: app.normalize_row, what /api/scrape runs per row, thumbnail included
+  - records:       ProductRecord.from_row(thumbnail_fn=...) -> list of slotted records
+  - batch:         ProductBatch.from_rows(thumbnail_fn=...) -> columns (also parses
+                   both price columns)
+
+and reports rows/sec plus the tracemalloc peak and retained size of each result.
+The price and thumbnail-path caches are cleared before every run, so the numbers
+are for rows the process has not seen before.
+"""
+import gc
+import json
+import random
+import sys
+import time
+import tracemalloc
+
+from app import normalize_row
+from image_proxy import proxied_image_path
+from records import ProductBatch, ProductRecord
+from scrapers import _parse_price_str
+
+SITES = ("amazon", "flipkart", "nykaa")
+
+
+def _legacy_normalize_row(row):
+    """Pre-records normalize_row, kept here as the baseline being compared against."""
+    import re
+
+    if not row:
+        return None
+    d = dict(row)
+    title = d.get("Title") or d.get("title") or ""
+    price = d.get("Price") or d.get("price") or ""
+    orig = d.get("OriginalPrice") or d.get("original_price") or d.get("Original Price") or ""
+    url = d.get("URL") or d.get("Product Link") or d.get("link") or d.get("url")
+    image = d.get("image") or d.get("img") or d.get("thumbnail")
+    dp = d.get("DiscountPercent") or d.get("discount_percent") or d.get("discount")
+    dp_num = None
+    if isinstance(dp, (int, float)):
+        dp_num = float(dp)
+    else:
+        m = re.search(r"(\d+(\.\d+)?)", str(dp))
+        if m:
+            dp_num = float(m.group(1))
+    return {
+        "site": (d.get("site") or "").lower(),
+        "title": title,
+        "price_text": price,
+        "original_price_text": orig,
+        "discount_percent": dp_num,
+        "discount_source": d.get("DiscountSource") or d.get("discount_source"),
+        "url": url,
+        "image": image,
+    }
+
+
+def make_rows(n, seed=7):
+    rnd = random.Random(seed)
+    # a realistic catalogue repeats: ~2k distinct products seen many times
+    catalogue = []
+    for i in range(2000):
+        price = rnd.randrange(99, 90000)
+        disc = rnd.choice((0, 5, 10, 15, 20, 25, 30, 40, 50, 60, 70))
+        orig = round(price * 100 / (100 - disc)) if disc else price
+        catalogue.append({
+            "site": rnd.choice(SITES),
+            "Title": f"Product {i} " + "x" * rnd.randrange(10, 60),
+            "Price": f"{price:,}",
+            "OriginalPrice": f"{orig:,}",
+            "DiscountPercent": float(disc) if rnd.random() < 0.7 else f"{disc}% off",
+            "DiscountSource": "scraped_badge" if disc else "none",
+            "URL": f"https://example.com/p/{i}",
+            "image": f"https://m.media-amazon.com/images/I/{i}.jpg",
+        })
+    return [dict(rnd.choice(catalogue)) for _ in range(n)]
+
+
+def _deep_size(obj, seen=None):
+    seen = seen if seen is not None else set()
+    if id(obj) in seen:
+        return 0
+    seen.add(id(obj))
+    size = sys.getsizeof(obj)
+    if isinstance(obj, dict):
+        size += sum(_deep_size(k, seen) + _deep_size(v, seen) for k, v in obj.items())
+    elif isinstance(obj, (list, tuple)):
+        size += sum(_deep_size(v, seen) for v in obj)
+    elif hasattr(obj, "__slots__"):
+        size += sum(_deep_size(getattr(obj, s), seen) for s in obj.__slots__ if hasattr(obj, s))
+    return size
+
+
+def _clear_caches():
+    _parse_price_str.cache_clear()
+    proxied_image_path.cache_clear()
+
+
+def _measure(name, fn, rows, repeat=3):
+    # timing runs without tracemalloc, which would slow every allocation down
+    elapsed = float("inf")
+    for _ in range(repeat):
+        _clear_caches()
+        gc.collect()
+        t0 = time.perf_counter()
+        fn(rows)
+        elapsed = min(elapsed, time.perf_counter() - t0)
+
+    _clear_caches()
+    gc.collect()
+    tracemalloc.start()
+    result = fn(rows)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return {
+        "path": name,
+        "rows": len(rows),
+        "seconds": round(elapsed, 4),
+        "rows_per_sec": round(len(rows) / elapsed) if elapsed else None,
+        "tracemalloc_peak_mb": round(peak / 1024 / 1024, 2),
+        "retained_mb": round(_deep_size(result) / 1024 / 1024, 2),
+    }
+
+
+def run(n):
+    rows = make_rows(n)
+    return [
+        _measure("legacy", lambda rs: [_legacy_normalize_row(r) for r in rs], rows),
+        _measure("normalize_row", lambda rs: [normalize_row(r) for r in rs], rows),
+        _measure("records", lambda rs: [ProductRecord.from_row(r, thumbnail_fn=proxied_image_path) for r in rs], rows),
+        _measure("batch", lambda rs: ProductBatch.from_rows(rs, thumbnail_fn=proxied_image_path), rows),
+    ]
+
+
+if __name__ == "__main__":
+    args = [a for a in sys.argv[1:] if not a.startswith("--")]
+    n = int(args[0]) if args else 200_000
+    report = run(n)
+    if "--json" in sys.argv:
+        print(json.dumps(report, indent=2))
+    else:
+        for r in report:
+            print(f"{r['path']:<13} {r['rows_per_sec']:>10,} rows/s   "
+                  f"peak {r['tracemalloc_peak_mb']:>7.1f} MB   retained {r['retained_mb']:>7.1f} MB")
@@ -0,0 +1,145 @@
+# bench_startup.py
+"""
+Cold-start benchmark for the backend.
+
+Each measurement runs in a fresh interpreter so nothing is already imported:
+
+    python bench_startup.py            # human-readable
+    python bench_startup.py --json     # machine-readable
+
+Reports: time to import the Flask app, time to import Playwright on its own,
+and the latency of the first vs. a repeat POST /api/scrape through the Flask
+test client. The sites are stubs that do everything a real scrape does before
+launching Chromium (import the real site module, import Playwright, pick a
+user agent), so the first request shows the whole lazy-loading cost.
+"""
+import json
+import os
+import subprocess
+import sys
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+_PROBE = r"""
+import asyncio, importlib, json, os, sys, tempfile, time
+from types import SimpleNamespace
+
+t0 = time.perf_counter()
+import app
+t_app = time.perf_counter() - t0
+
+import delivery
+import sites
+
+tmp = tempfile.mkdtemp(prefix="bench-startup-")
+app.ALERTS_FILE = os.path.join(tmp, "alerts.json")
+delivery.OUTBOX_FILE = os.path.join(tmp, "outbox.db")
+
+
+REAL_MODULES = dict(sites.SITE_MODULES)  # register_site() repoints these at the stubs
+
+
+def cold_stub(name):
+    # Does everything a real scrape does before launching Chromium: imports
+    # the real site module, imports Playwright, picks a user agent.
+    async def scrape(keyword="laptop", max_products=12, **_):
+        importlib.import_module(REAL_MODULES[name])
+        try:
+            import playwright.async_api  # noqa: F401
+        except ImportError:
+            pass
+        from scrapers import get_user_agent
+        get_user_agent()
+        return [{"site": name, "ID": f"{name}-{i}", "Title": f"{keyword} {i}", "Price": "1,999",
+                 "OriginalPrice": "2,999", "DiscountPercent": 33.0, "URL": f"https://stub.invalid/{i}"}
+                for i in range(max_products)]
+    return SimpleNamespace(NAME=name, DEFAULTS={}, scrape=scrape)
+
+
+for name in sites.available_sites():
+    sites.register_site(cold_stub(name))
+
+client = app.app.test_client()
+scrape = {}
+for label in ("first", "repeat"):
+    t = time.perf_counter()
+    resp = client.post("/api/scrape", json={"keyword": "laptop", "max_products": 12})
+    scrape[label] = time.perf_counter() - t
+    body = resp.get_json()
+    assert resp.status_code == 200 and not body.get("site_errors"), body
+
+print(json.dumps({
+    "import_app_s": t_app,
+    "scrape_request_s": scrape,
+    "playwright_loaded": "playwright" in sys.modules,
+}))
+"""
+
+_IMPORT_ONLY = r"""
+import sys, json, time
+t0 = time.perf_counter()
+import app
+print(json.dumps({
+    "import_app_s": time.perf_counter() - t0,
+    "heavy_modules_loaded": sorted(m for m in ("playwright", "fake_useragent") if m in sys.modules),
+}))
+"""
+
+_IMPORT_PLAYWRIGHT = r"""
+import json, time
+t0 = time.perf_counter()
+try:
+    import playwright.async_api
+    result = time.perf_counter() - t0
+except ImportError as e:
+    result = repr(e)
+print(json.dumps({"import_playwright_s": result}))
+"""
+
+
+def _run(code):
+    out = subprocess.run(
+        [sys.executable, "-c", code], cwd=HERE, capture_output=True, text=True, check=True
+    )
+    return json.loads(out.stdout.strip().splitlines()[-1])
+
+
+def _median(values):
+    values = sorted(values)
+    return values[len(values) // 2]
+
+
+def main(runs=5):
+    imports = [_run(_IMPORT_ONLY) for _ in range(runs)]
+    playwright = [_run(_IMPORT_PLAYWRIGHT)["import_playwright_s"] for _ in range(runs)]
+    requests = [_run(_PROBE) for _ in range(runs)]
+    times = sorted(r["import_app_s"] for r in imports)
+    return {
+        "runs": runs,
+        "import_app_median_s": _median(times),
+        "import_app_min_s": times[0],
+        "heavy_modules_loaded_at_import": imports[0]["heavy_modules_loaded"],
+        "import_playwright_median_s": _median(playwright) if all(isinstance(v, float) for v in playwright)
+        else playwright[0],
+        "first_scrape_request_median_s": _median(r["scrape_request_s"]["first"] for r in requests),
+        "repeat_scrape_request_median_s": _median(r["scrape_request_s"]["repeat"] for r in requests),
+        "playwright_in_first_request": requests[0]["playwright_loaded"],
+    }
+
+
+def _ms(v):
+    return f"{v * 1000:.1f} ms" if isinstance(v, float) else str(v)
+
+
+if __name__ == "__main__":
+    result = main()
+    if "--json" in sys.argv:
+        print(json.dumps(result, indent=2))
+    else:
+        print(f"import app         median {_ms(result['import_app_median_s'])} "
+              f"(min {_ms(result['import_app_min_s'])}, {result['runs']} runs)")
+        print(f"heavy at import    {result['heavy_modules_loaded_at_import'] or 'none'}")
+        print(f"import playwright  median {_ms(result['import_playwright_median_s'])}")
+        print(f"first /api/scrape  median {_ms(result['first_scrape_request_median_s'])}"
+              f"{'' if result['playwright_in_first_request'] else ' (Playwright not installed)'}")
+        print(f"repeat /api/scrape median {_ms(result['repeat_scrape_request_median_s'])}")
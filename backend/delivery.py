@@ -0,0 +1,735 @@
+# delivery.py
+"""
+Alert notification delivery.
+
+Triggered alerts are written to an SQLite outbox. A DeliveryWorker claims due
+rows, coalesces everything pending for one contact into a single digest,
+sends it through a pooled sink (SMTP for "Email", webhook for everything else)
+under a token-bucket rate limit, and retries failures with exponential backoff
+until they are dead-lettered.
+
+Local stand-ins make the whole path testable without real providers:
+
+    python delivery.py standin-smtp --port 2525
+    python delivery.py standin-webhook --port 8025 --fail-rate 0.1
+    python delivery.py bench --alerts 20000 --contacts 2000 --sink smtp
+"""
+import argparse
+import asyncio
+import json
+import logging
+import os
+import queue
+import random
+import re
+import smtplib
+import threading
+import time
+from email.message import EmailMessage
+from urllib.parse import urlsplit
+
+from sqlite_util import connect, transaction
+
+logger = logging.getLogger(__name__)
+
+
+# --------------------
+# Config
+# --------------------
+OUTBOX_FILE = os.environ.get("ALERT_OUTBOX_DB", os.path.join(os.path.dirname(__file__), "outbox.db"))
+SMTP_HOST = os.environ.get("ALERT_SMTP_HOST")
+SMTP_PORT = int(os.environ.get("ALERT_SMTP_PORT", 587))
+SMTP_USER = os.environ.get("ALERT_SMTP_USER")
+SMTP_PASSWORD = os.environ.get("ALERT_SMTP_PASSWORD")
+SMTP_STARTTLS = os.environ.get("ALERT_SMTP_STARTTLS", "1") not in ("", "0")
+SMTP_FROM = os.environ.get("ALERT_SMTP_FROM", "alerts@dealscope.local")
+WEBHOOK_URL = os.environ.get("ALERT_WEBHOOK_URL")
+
+RATE_PER_SEC = float(os.environ.get("ALERT_RATE_PER_SEC", 20))
+RATE_BURST = int(os.environ.get("ALERT_RATE_BURST", 40))
+POOL_SIZE = int(os.environ.get("ALERT_POOL_SIZE", 4))
+MAX_ATTEMPTS = int(os.environ.get("ALERT_MAX_ATTEMPTS", 5))
+BACKOFF_BASE_S = float(os.environ.get("ALERT_BACKOFF_BASE", 30))
+BACKOFF_CAP_S = 3600.0
+CLAIM_LIMIT = 5000
+SENDING_LEASE_S = 300  # rows stuck in "sending" this long (crashed worker) become due again
+
+
+class DeliveryError(Exception):
+    """A sink could not deliver a digest."""
+
+
+class PermanentDeliveryError(DeliveryError):
+    """Retrying cannot help (e.g. the recipient was refused); dead-letter straight away."""
+
+
+# ------------------------------------------------------------------
+# Outbox (SQLite)
+# ------------------------------------------------------------------
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS outbox (
+    id              INTEGER PRIMARY KEY AUTOINCREMENT,
+    dedup_key       TEXT UNIQUE,
+    alert_id        TEXT,
+    method          TEXT NOT NULL,
+    contact         TEXT NOT NULL,
+    payload         TEXT NOT NULL,
+    status          TEXT NOT NULL DEFAULT 'pending',
+    attempts        INTEGER NOT NULL DEFAULT 0,
+    next_attempt_at REAL NOT NULL,
+    last_error      TEXT,
+    created_at      REAL NOT NULL,
+    sent_at         REAL
+);
+CREATE INDEX IF NOT EXISTS outbox_due ON outbox (status, next_attempt_at);
+"""
+
+
+class Outbox:
+    def __init__(self, path=OUTBOX_FILE):
+        self.path = path
+        self._lock = threading.Lock()
+        self._db = connect(path)
+        self._db.executescript(_SCHEMA)
+
+    def enqueue(self, entries):
+        """
+        entries: iterable of dicts with method, contact, payload and optional
+        alert_id / dedup_key. Rows with a dedup_key already in the outbox are
+        ignored, so re-scraping the same deal does not notify twice.
+        Returns the number of rows inserted.
+        """
+        now = time.time()
+        rows = [
+            (
+                e.get("dedup_key"),
+                e.get("alert_id"),
+                e["method"],
+                e["contact"],
+                json.dumps(e["payload"], ensure_ascii=False),
+                now,
+                now,
+            )
+            for e in entries
+        ]
+        with self._lock:
+            before = self._db.total_changes
+            with transaction(self._db):
+                self._db.executemany(
+                    "INSERT OR IGNORE INTO outbox "
+                    "(dedup_key, alert_id, method, contact, payload, next_attempt_at, created_at) "
+                    "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                    rows,
+                )
+            return self._db.total_changes - before
+
+    def claim(self, limit=CLAIM_LIMIT):
+        """Mark due rows as sending and return them grouped by (method, contact)."""
+        now = time.time()
+        with self._lock, transaction(self._db, "BEGIN IMMEDIATE"):
+            rows = self._db.execute(
+                "SELECT id, method, contact, payload, attempts FROM outbox "
+                "WHERE (status = 'pending' AND next_attempt_at <= ?) "
+                "   OR (status = 'sending' AND next_attempt_at <= ?) "
+                "ORDER BY next_attempt_at LIMIT ?",
+                (now, now - SENDING_LEASE_S, limit),
+            ).fetchall()
+            self._db.executemany(
+                "UPDATE outbox SET status = 'sending', next_attempt_at = ? WHERE id = ?",
+                [(now, r[0]) for r in rows],
+            )
+
+        groups = {}
+        for row_id, method, contact, payload, attempts in rows:
+            g = groups.setdefault((method, contact), {"ids": [], "items": [], "attempts": 0})
+            g["ids"].append(row_id)
+            g["items"].append(json.loads(payload))
+            g["attempts"] = max(g["attempts"], attempts)
+        return groups
+
+    def mark_sent(self, ids):
+        with self._lock:
+            self._db.executemany(
+                "UPDATE outbox SET status = 'sent', sent_at = ?, attempts = attempts + 1 WHERE id = ?",
+                [(time.time(), i) for i in ids],
+            )
+
+    def mark_failed(self, ids, error, attempts, max_attempts=MAX_ATTEMPTS, backoff_base=BACKOFF_BASE_S):
+        """Schedule a retry with exponential backoff, or dead-letter after max_attempts."""
+        attempts += 1
+        if attempts >= max_attempts:
+            status, next_at = "dead", time.time()
+            logger.warning("Dead-lettering %d outbox rows after %d attempts: %s", len(ids), attempts, error)
+        else:
+            delay = min(BACKOFF_CAP_S, backoff_base * (2 ** (attempts - 1)))
+            status, next_at = "pending", time.time() + delay * random.uniform(0.8, 1.2)
+        with self._lock:
+            self._db.executemany(
+                "UPDATE outbox SET status = ?, attempts = ?, next_attempt_at = ?, last_error = ? WHERE id = ?",
+                [(status, attempts, next_at, str(error)[:500], i) for i in ids],
+            )
+
+    def requeue_dead(self):
+        with self._lock:
+            cur = self._db.execute(
+                "UPDATE outbox SET status = 'pending', attempts = 0, next_attempt_at = ? WHERE status = 'dead'",
+                (time.time(),),
+            )
+            return cur.rowcount
+
+    def stats(self):
+        with self._lock:
+            rows = self._db.execute("SELECT status, COUNT(*) FROM outbox GROUP BY status").fetchall()
+        counts = {"pending": 0, "sending": 0, "sent": 0, "dead": 0}
+        counts.update(dict(rows))
+        return counts
+
+
+# ------------------------------------------------------------------
+# Triggering
+# ------------------------------------------------------------------
+_NUM = re.compile(r"\d+(\.\d+)?")
+
+
+def _threshold(alert):
+    m = _NUM.search(str(alert.get("discount") or alert.get("threshold") or ""))
+    return float(m.group(0)) if m else 0.0
+
+
+def _url_key(url):
+    """Scheme/host/path of a product URL; tracking query strings vary between scrapes."""
+    if not url:
+        return None
+    parts = urlsplit(url.strip())
+    return (parts.netloc.lower(), parts.path.rstrip("/"))
+
+
+def _matcher(alert, keyword):
+    """
+    Predicate over scraped items for one alert, or None if the alert cannot
+    match this scrape at all.
+
+    Alerts created from a product card carry its id / url / site: only that
+    product matches, whatever the search keyword was. Older alerts without
+    them fall back to matching every item of a scrape on the same keyword.
+    """
+    site = (alert.get("site") or "").lower() or None
+    product_id = alert.get("product_id")
+    product_url = _url_key(alert.get("product_url"))
+    if product_id or product_url:
+        def match(item):
+            if site and (item.get("site") or "").lower() != site:
+                return False
+            if product_id and item.get("id"):
+                return str(item["id"]) == str(product_id)
+            return product_url is not None and _url_key(item.get("url")) == product_url
+        return match
+
+    kw = (keyword or "").strip().lower()
+    if (alert.get("keyword") or "").strip().lower() != kw:
+        return None
+    return lambda item: True
+
+
+def _alert_key(alert):
+    """Stable identity for an alert; legacy alerts saved without an id use what defines them."""
+    if alert.get("id"):
+        return alert["id"]
+    return "|".join(str(alert.get(k) or "") for k in ("contact", "method", "keyword"))
+
+
+def triggered_entries(alerts, keyword, items):
+    """
+    Outbox entries for every alert whose product (or, for keyword-only alerts,
+    whose keyword) appears in `items` at or above the alert's discount threshold.
+    """
+    entries = []
+    for alert in alerts:
+        if not alert.get("contact"):
+            continue
+        match = _matcher(alert, keyword)
+        if match is None:
+            continue
+        threshold = _threshold(alert)
+        alert_key = _alert_key(alert)
+        for item in items:
+            dp = item.get("discount_percent")
+            if dp is None or dp < threshold or not match(item):
+                continue
+            item_key = item.get("id") or item.get("url") or item.get("title")
+            entries.append({
+                "alert_id": alert.get("id"),
+                "dedup_key": f"{alert_key}|{item.get('site')}|{item_key}|{item.get('price_text')}",
+                "method": alert.get("method") or "Email",
+                "contact": alert["contact"],
+                "payload": {
+                    "keyword": alert.get("keyword"),
+                    "threshold": threshold,
+                    "site": item.get("site"),
+                    "title": item.get("title"),
+                    "price_text": item.get("price_text"),
+                    "discount_percent": dp,
+                    "url": item.get("url"),
+                },
+            })
+    return entries
+
+
+def build_digest(contact, items):
+    """One message summarizing every triggered deal for a contact."""
+    items = sorted(items, key=lambda i: -(i.get("discount_percent") or 0))
+    lines = [
+        f"- {i.get('title')} ({i.get('site')}): ₹{i.get('price_text')} "
+        f"at {i.get('discount_percent'):.0f}% off\n  {i.get('url') or ''}"
+        for i in items
+    ]
+    keywords = sorted({str(i.get("keyword")) for i in items})
+    return {
+        "contact": contact,
+        "subject": f"DealScope: {len(items)} new deal{'s' if len(items) != 1 else ''} for {', '.join(keywords)}",
+        "text": "Deals matching your alerts:\n\n" + "\n".join(lines),
+        "items": items,
+    }
+
+
+# ------------------------------------------------------------------
+# Sinks (blocking clients behind a connection pool; called via to_thread)
+# ------------------------------------------------------------------
+class SMTPSink:
+    def __init__(self, host, port, user=None, password=None, sender=SMTP_FROM,
+                 starttls=SMTP_STARTTLS, pool_size=POOL_SIZE, timeout=20):
+        self.host, self.port = host, port
+        self.user, self.password = user, password
+        self.sender = sender
+        self.starttls = starttls
+        self.timeout = timeout
+        self.pool_size = pool_size
+        self._pool = queue.LifoQueue()
+
+    def _connect(self):
+        conn = smtplib.SMTP(self.host, self.port, timeout=self.timeout)
+        conn.ehlo()
+        if self.starttls and conn.has_extn("starttls"):
+            conn.starttls()
+            conn.ehlo()
+        if self.user:
+            conn.login(self.user, self.password or "")
+        return conn
+
+    def _discard(self, conn):
+        try:
+            conn.close()
+        except Exception:
+            pass
+
+    def _send_on(self, conn, msg):
+        """Send on `conn` and return it to the pool; SMTPServerDisconnected passes through."""
+        try:
+            conn.send_message(msg)
+        except smtplib.SMTPRecipientsRefused as e:
+            self._pool.put(conn)
+            raise PermanentDeliveryError(f"recipient refused: {e}") from e
+        except smtplib.SMTPServerDisconnected:
+            self._discard(conn)
+            raise
+        except (smtplib.SMTPException, OSError) as e:
+            self._discard(conn)
+            raise DeliveryError(str(e)) from e
+        self._pool.put(conn)
+
+    def send(self, digest):
+        msg = EmailMessage()
+        msg["From"] = self.sender
+        msg["To"] = digest["contact"]
+        msg["Subject"] = digest["subject"]
+        msg.set_content(digest["text"])
+
+        try:
+            conn = self._pool.get_nowait()
+        except queue.Empty:
+            conn = None
+        if conn is not None:
+            try:
+                return self._send_on(conn, msg)
+            except smtplib.SMTPServerDisconnected:
+                # the server closed this pooled connection while it sat idle
+                logger.debug("Pooled SMTP connection was closed; reconnecting")
+
+        try:
+            conn = self._connect()
+        except (smtplib.SMTPException, OSError) as e:
+            raise DeliveryError(f"cannot connect to {self.host}:{self.port}: {e}") from e
+        try:
+            self._send_on(conn, msg)
+        except smtplib.SMTPServerDisconnected as e:
+            raise DeliveryError(str(e)) from e
+
+    def close(self):
+        while True:
+            try:
+                conn = self._pool.get_nowait()
+            except queue.Empty:
+                return
+            try:
+                conn.quit()
+            except Exception:
+                pass
+
+
+class WebhookSink:
+    def __init__(self, url, pool_size=POOL_SIZE, timeout=15):
+        import requests
+        from requests.adapters import HTTPAdapter
+
+        self.url = url
+        self.timeout = timeout
+        self.pool_size = pool_size
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+
+    def send(self, digest):
+        try:
+            resp = self.session.post(self.url, json=digest, timeout=self.timeout)
+        except Exception as e:
+            raise DeliveryError(str(e)) from e
+        if resp.status_code >= 300:
+            raise DeliveryError(f"webhook returned {resp.status_code}")
+
+    def close(self):
+        self.session.close()
+
+
+def sinks_from_env():
+    """{'Email': SMTPSink, '*': WebhookSink} for whatever is configured."""
+    sinks = {}
+    if SMTP_HOST:
+        sinks["Email"] = SMTPSink(SMTP_HOST, SMTP_PORT, SMTP_USER, SMTP_PASSWORD)
+    if WEBHOOK_URL:
+        sinks["*"] = WebhookSink(WEBHOOK_URL)
+    return sinks
+
+
+# ------------------------------------------------------------------
+# Rate limiting + worker
+# ------------------------------------------------------------------
+class TokenBucket:
+    def __init__(self, rate, burst):
+        self.rate = rate
+        self.capacity = burst
+        self.tokens = float(burst)
+        self.updated = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    async def acquire(self):
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                await asyncio.sleep((1 - self.tokens) / self.rate)
+
+
+class DeliveryWorker:
+    def __init__(self, outbox, sinks, rate=RATE_PER_SEC, burst=RATE_BURST,
+                 max_attempts=MAX_ATTEMPTS, backoff_base=BACKOFF_BASE_S):
+        self.outbox = outbox
+        self.sinks = sinks
+        self.limiter = TokenBucket(rate, burst)
+        self.max_attempts = max_attempts
+        self.backoff_base = backoff_base
+        self.stats = {"digests_sent": 0, "alerts_sent": 0, "failures": 0, "send_seconds": 0.0}
+
+    def _sink_for(self, method):
+        return self.sinks.get(method) or self.sinks.get("*")
+
+    async def _deliver(self, method, contact, group, sem):
+        sink = self._sink_for(method)
+        if sink is None:
+            self.outbox.mark_failed(group["ids"], f"no sink configured for {method}",
+                                    self.max_attempts - 1, self.max_attempts)
+            self.stats["failures"] += 1
+            return
+        digest = build_digest(contact, group["items"])
+        async with sem:
+            await self.limiter.acquire()
+            try:
+                await asyncio.to_thread(sink.send, digest)
+            except PermanentDeliveryError as e:
+                self.stats["failures"] += 1
+                self.outbox.mark_failed(group["ids"], e, self.max_attempts - 1, self.max_attempts)
+                return
+            except Exception as e:
+                self.stats["failures"] += 1
+                self.outbox.mark_failed(group["ids"], e, group["attempts"], self.max_attempts, self.backoff_base)
+                return
+        self.outbox.mark_sent(group["ids"])
+        self.stats["digests_sent"] += 1
+        self.stats["alerts_sent"] += len(group["ids"])
+
+    async def run_once(self):
+        """Claim everything due, deliver one digest per contact. Returns digests attempted."""
+        groups = self.outbox.claim()
+        if not groups:
+            return 0
+        pool = max((getattr(s, "pool_size", POOL_SIZE) for s in self.sinks.values()), default=POOL_SIZE)
+        sem = asyncio.Semaphore(pool)
+        t0 = time.perf_counter()
+        await asyncio.gather(*(
+            self._deliver(method, contact, g, sem) for (method, contact), g in groups.items()
+        ))
+        self.stats["send_seconds"] += time.perf_counter() - t0
+        return len(groups)
+
+    async def run(self, stop, idle_sleep=2.0):
+        while not stop.is_set():
+            try:
+                if not await self.run_once():
+                    await asyncio.sleep(idle_sleep)
+            except Exception:
+                logger.exception("Delivery loop error")
+                await asyncio.sleep(idle_sleep)
+
+    def throughput(self):
+        s = self.stats["send_seconds"]
+        return {
+            **self.stats,
+            "digests_per_sec": round(self.stats["digests_sent"] / s, 1) if s else None,
+            "alerts_per_sec": round(self.stats["alerts_sent"] / s, 1) if s else None,
+        }
+
+
+def start_background_worker(outbox, sinks):
+    """Run a DeliveryWorker forever on a daemon thread with its own event loop."""
+    worker = DeliveryWorker(outbox, sinks)
+    stop = threading.Event()
+    thread = threading.Thread(
+        target=lambda: asyncio.run(worker.run(stop)), name="alert-delivery", daemon=True
+    )
+    thread.start()
+    return worker, stop
+
+
+_outbox = None
+_worker = None
+_init_lock = threading.Lock()
+
+
+def get_outbox():
+    """Process-wide outbox; also starts the delivery worker if any sink is configured."""
+    global _outbox, _worker
+    if _outbox is None:
+        with _init_lock:
+            if _outbox is None:
+                outbox = Outbox(OUTBOX_FILE)
+                sinks = sinks_from_env()
+                if sinks:
+                    _worker, _ = start_background_worker(outbox, sinks)
+                    logger.info("Alert delivery worker started (sinks: %s)", ", ".join(sinks))
+                _outbox = outbox
+    return _outbox
+
+
+def get_worker():
+    return _worker
+
+
+# ------------------------------------------------------------------
+# Local stand-in servers
+# ------------------------------------------------------------------
+class StandinSMTP:
+    """Just enough SMTP (EHLO/MAIL/RCPT/DATA/RSET/NOOP/QUIT) to accept and count messages."""
+
+    def __init__(self, host="127.0.0.1", port=0, fail_rate=0.0):
+        self.host, self.port = host, port
+        self.fail_rate = fail_rate
+        self.received = 0
+        self.server = None
+
+    async def _handle(self, reader, writer):
+        def reply(line):
+            writer.write(line.encode() + b"\r\n")
+
+        reply("220 standin ESMTP")
+        in_data = False
+        try:
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                if in_data:
+                    if line in (b".\r\n", b".\n"):
+                        in_data = False
+                        if self.fail_rate and random.random() < self.fail_rate:
+                            reply("451 temporary failure")
+                        else:
+                            self.received += 1
+                            reply("250 OK queued")
+                    continue
+                cmd = line[:4].upper()
+                if cmd == b"EHLO":
+                    reply("250-standin")
+                    reply("250 8BITMIME")
+                elif cmd == b"HELO":
+                    reply("250 standin")
+                elif cmd in (b"MAIL", b"RCPT", b"RSET", b"NOOP"):
+                    reply("250 OK")
+                elif cmd == b"DATA":
+                    in_data = True
+                    reply("354 end with <CRLF>.<CRLF>")
+                elif cmd == b"QUIT":
+                    reply("221 bye")
+                    await writer.drain()
+                    break
+                else:
+                    reply("502 not implemented")
+                await writer.drain()
+        finally:
+            writer.close()
+
+    async def start(self):
+        self.server = await asyncio.start_server(self._handle, self.host, self.port)
+        self.port = self.server.sockets[0].getsockname()[1]
+        return self
+
+
+def start_standin_webhook(host="127.0.0.1", port=0, fail_rate=0.0):
+    """Threaded HTTP server that accepts POSTed digests. Returns (server, counter dict)."""
+    from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+    counter = {"received": 0}
+    lock = threading.Lock()
+
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def do_POST(self):
+            self.rfile.read(int(self.headers.get("Content-Length", 0)))
+            failed = fail_rate and random.random() < fail_rate
+            if not failed:
+                with lock:
+                    counter["received"] += 1
+            self.send_response(503 if failed else 204)
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer((host, port), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, counter
+
+
+# ------------------------------------------------------------------
+# Benchmark
+# ------------------------------------------------------------------
+def _synthetic_entries(n_alerts, n_contacts, method):
+    rnd = random.Random(3)
+    return [
+        {
+            "alert_id": f"a{i}",
+            "dedup_key": f"bench-{i}",
+            "method": method,
+            "contact": f"user{rnd.randrange(n_contacts)}@example.com",
+            "payload": {
+                "keyword": "laptop", "threshold": 30, "site": "amazon",
+                "title": f"Laptop {i}", "price_text": "49,990", "discount_percent": 35.0,
+                "url": f"https://example.com/{i}",
+            },
+        }
+        for i in range(n_alerts)
+    ]
+
+
+async def _bench(args):
+    import tempfile
+
+    db = tempfile.NamedTemporaryFile(suffix=".db", delete=False).name
+    outbox = Outbox(db)
+    if args.sink == "smtp":
+        standin = await StandinSMTP(fail_rate=args.fail_rate).start()
+        sinks = {"Email": SMTPSink("127.0.0.1", standin.port, starttls=False, pool_size=args.pool)}
+        method, received = "Email", lambda: standin.received
+    else:
+        server, counter = start_standin_webhook(fail_rate=args.fail_rate)
+        sinks = {"*": WebhookSink(f"http://127.0.0.1:{server.server_port}/", pool_size=args.pool)}
+        method, received = "SMS", lambda: counter["received"]
+
+    t0 = time.perf_counter()
+    outbox.enqueue(_synthetic_entries(args.alerts, args.contacts, method))
+    enqueue_s = time.perf_counter() - t0
+
+    worker = DeliveryWorker(outbox, sinks, rate=args.rate, burst=args.pool * 2,
+                            max_attempts=args.max_attempts, backoff_base=0.05)
+    t0 = time.perf_counter()
+    while True:
+        await worker.run_once()
+        st = outbox.stats()
+        if not st["pending"] and not st["sending"]:
+            break
+        await asyncio.sleep(0.05)
+    elapsed = time.perf_counter() - t0
+    for s in sinks.values():
+        await asyncio.to_thread(s.close)  # SMTP QUIT needs the stand-in's loop to answer
+    if args.sink == "smtp":
+        standin.server.close()
+        await standin.server.wait_closed()
+    else:
+        server.shutdown()
+    os.unlink(db)
+
+    return {
+        "sink": args.sink,
+        "alerts": args.alerts,
+        "contacts": args.contacts,
+        "enqueue_alerts_per_sec": round(args.alerts / enqueue_s),
+        "elapsed_s": round(elapsed, 2),
+        "messages_per_sec": round(worker.stats["digests_sent"] / elapsed, 1),
+        "alerts_per_sec": round(worker.stats["alerts_sent"] / elapsed, 1),
+        "received_by_sink": received(),
+        "outbox": st,
+        "worker": worker.throughput(),
+    }
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    sub = ap.add_subparsers(dest="cmd", required=True)
+    p = sub.add_parser("standin-smtp")
+    p.add_argument("--port", type=int, default=2525)
+    p.add_argument("--fail-rate", type=float, default=0.0)
+    p = sub.add_parser("standin-webhook")
+    p.add_argument("--port", type=int, default=8025)
+    p.add_argument("--fail-rate", type=float, default=0.0)
+    p = sub.add_parser("bench")
+    p.add_argument("--alerts", type=int, default=10000)
+    p.add_argument("--contacts", type=int, default=1000)
+    p.add_argument("--sink", choices=("smtp", "webhook"), default="smtp")
+    p.add_argument("--pool", type=int, default=POOL_SIZE)
+    p.add_argument("--rate", type=float, default=1e9, help="token-bucket rate (default: unlimited)")
+    p.add_argument("--fail-rate", type=float, default=0.0)
+    p.add_argument("--max-attempts", type=int, default=MAX_ATTEMPTS)
+    args = ap.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO)
+    if args.cmd == "standin-smtp":
+        async def serve():
+            s = await StandinSMTP(port=args.port, fail_rate=args.fail_rate).start()
+            print(f"stand-in SMTP on 127.0.0.1:{s.port}")
+            await s.server.serve_forever()
+        asyncio.run(serve())
+    elif args.cmd == "standin-webhook":
+        server, _ = start_standin_webhook(port=args.port, fail_rate=args.fail_rate)
+        print(f"stand-in webhook on http://127.0.0.1:{server.server_port}/")
+        threading.Event().wait()
+    else:
+        print(json.dumps(asyncio.run(_bench(args)), indent=2))
+
+
+if __name__ == "__main__":
+    main()
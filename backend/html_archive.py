@@ -0,0 +1,417 @@
+# html_archive.py
+"""
+Raw search-page archive.
+
+Every search page a scraper reads is saved here as compressed HTML, so a
+broken selector can be fixed and checked against real pages - and results
+rebuilt - without a browser or network:
+
+    python html_archive.py stats
+    python html_archive.py reextract --site nykaa --jobs 8 --out rebuilt.jsonl
+    python html_archive.py reextract --latest --out results.jsonl
+    python html_archive.py prune --max-mb 200
+
+Layout under ARCHIVE_DIR:
+  blobs/<aa>/<sha256>.zst  - page HTML, named by the digest of the raw bytes
+  index.db                 - SQLite: blobs (digest, codec, sizes, last_seen) and
+                             captures (site, keyword, page, url, fetched_at, digest)
+Re-fetching an identical page adds a capture row but no new blob. When the
+blobs outgrow ARCHIVE_MAX_BYTES the least recently seen ones are evicted
+together with the captures that point at them.
+"""
+import argparse
+import asyncio
+import hashlib
+import json
+import logging
+import os
+import sys
+import threading
+import time
+import zlib
+from concurrent.futures import ProcessPoolExecutor
+
+from sqlite_util import connect, transaction
+
+try:
+    import zstandard
+except ImportError:  # zstandard is optional; without it pages are stored with zlib
+    zstandard = None
+
+logger = logging.getLogger(__name__)
+
+
+# --------------------
+# Config
+# --------------------
+ARCHIVE_ENABLED = os.environ.get("HTML_ARCHIVE", "1") not in ("", "0")
+ARCHIVE_DIR = os.environ.get(
+    "HTML_ARCHIVE_DIR", os.path.join(os.path.dirname(__file__), "html_archive")
+)
+ARCHIVE_MAX_BYTES = int(os.environ.get("HTML_ARCHIVE_MAX_BYTES", 512 * 1024 * 1024))
+ZSTD_LEVEL = int(os.environ.get("HTML_ARCHIVE_ZSTD_LEVEL", 10))
+
+_EXTENSIONS = {"zstd": ".zst", "zlib": ".zz"}
+
+
+# --------------------
+# Codecs
+# --------------------
+def default_codec():
+    return "zstd" if zstandard is not None else "zlib"
+
+
+def compress(data, codec):
+    if codec == "zstd":
+        return zstandard.ZstdCompressor(level=ZSTD_LEVEL).compress(data)
+    return zlib.compress(data, 6)
+
+
+def decompress(data, codec):
+    if codec == "zstd":
+        if zstandard is None:
+            raise RuntimeError("archive blob is zstd-compressed but zstandard is not installed")
+        return zstandard.ZstdDecompressor().decompress(data)
+    return zlib.decompress(data)
+
+
+# ------------------------------------------------------------------
+# Archive
+# ------------------------------------------------------------------
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS blobs (
+    digest      TEXT PRIMARY KEY,
+    codec       TEXT NOT NULL,
+    raw_size    INTEGER NOT NULL,
+    stored_size INTEGER NOT NULL,
+    last_seen   REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS blobs_last_seen ON blobs (last_seen);
+CREATE TABLE IF NOT EXISTS captures (
+    id          INTEGER PRIMARY KEY AUTOINCREMENT,
+    site        TEXT NOT NULL,
+    keyword     TEXT,
+    page        INTEGER,
+    url         TEXT,
+    fetched_at  REAL NOT NULL,
+    digest      TEXT NOT NULL REFERENCES blobs (digest)
+);
+CREATE INDEX IF NOT EXISTS captures_site ON captures (site, fetched_at);
+CREATE INDEX IF NOT EXISTS captures_digest ON captures (digest);
+"""
+
+
+class HtmlArchive:
+    def __init__(self, root=ARCHIVE_DIR, max_bytes=ARCHIVE_MAX_BYTES, codec=None):
+        self.root = root
+        self.max_bytes = max_bytes
+        self.codec = codec or default_codec()
+        self.blob_dir = os.path.join(root, "blobs")
+        os.makedirs(self.blob_dir, exist_ok=True)
+        self._lock = threading.Lock()
+        self._db = connect(os.path.join(root, "index.db"))
+        self._db.executescript(_SCHEMA)
+        self._total = self._db.execute("SELECT COALESCE(SUM(stored_size), 0) FROM blobs").fetchone()[0]
+
+    @property
+    def total_bytes(self):
+        return self._total
+
+    def blob_path(self, digest, codec):
+        return os.path.join(self.blob_dir, digest[:2], digest + _EXTENSIONS[codec])
+
+    # ---- write ----
+    def _blob_row_locked(self, digest):
+        """(codec, stored_size) if the blob is indexed and on disk, else None."""
+        row = self._db.execute("SELECT codec, stored_size FROM blobs WHERE digest = ?", (digest,)).fetchone()
+        if row is None or not os.path.exists(self.blob_path(digest, row[0])):
+            return None
+        return row
+
+    def _record_locked(self, site, keyword, page, url, digest, now, packed=None, codec=None, raw_size=0):
+        """
+        Add a capture of `digest` in one step with the blob check, so an eviction
+        cannot slip in between. With `packed`, (re)writes the blob if it is missing
+        – never indexed, or evicted since the caller last looked. Returns False if
+        the blob is missing and no `packed` bytes were given.
+        """
+        with transaction(self._db):
+            if self._blob_row_locked(digest) is not None:
+                self._db.execute("UPDATE blobs SET last_seen = ? WHERE digest = ?", (now, digest))
+            elif packed is None:
+                return False
+            else:
+                stale = self._db.execute("SELECT stored_size FROM blobs WHERE digest = ?", (digest,)).fetchone()
+                path = self.blob_path(digest, codec)
+                os.makedirs(os.path.dirname(path), exist_ok=True)
+                tmp = f"{path}.{threading.get_ident()}.tmp"
+                with open(tmp, "wb") as f:
+                    f.write(packed)
+                os.replace(tmp, path)
+                self._db.execute(
+                    "INSERT OR REPLACE INTO blobs (digest, codec, raw_size, stored_size, last_seen) "
+                    "VALUES (?, ?, ?, ?, ?)",
+                    (digest, codec, raw_size, len(packed), now),
+                )
+                self._total += len(packed) - (stale[0] if stale else 0)
+            self._db.execute(
+                "INSERT INTO captures (site, keyword, page, url, fetched_at, digest) VALUES (?, ?, ?, ?, ?, ?)",
+                (site, keyword, page, url, now, digest),
+            )
+        self._evict_locked(keep=digest)
+        return True
+
+    def store(self, site, keyword, page, url, html):
+        """Save one fetched page; returns its digest. Identical pages share one blob."""
+        data = html.encode("utf-8")
+        digest = hashlib.sha256(data).hexdigest()
+        now = time.time()
+
+        with self._lock:
+            if self._record_locked(site, keyword, page, url, digest, now):
+                return digest
+
+        # compress outside the lock; concurrent scrapes archive in parallel
+        codec = self.codec
+        packed = compress(data, codec)
+        with self._lock:
+            self._record_locked(site, keyword, page, url, digest, now, packed, codec, len(data))
+        return digest
+
+    def _evict_locked(self, keep=None, max_bytes=None):
+        limit = self.max_bytes if max_bytes is None else max_bytes
+        if self._total <= limit:
+            return 0
+        evicted = []
+        for digest, codec, size in self._db.execute(
+            "SELECT digest, codec, stored_size FROM blobs ORDER BY last_seen"
+        ).fetchall():
+            if self._total <= limit:
+                break
+            if digest == keep:
+                continue
+            try:
+                os.remove(self.blob_path(digest, codec))
+            except OSError:
+                pass
+            self._total -= size
+            evicted.append((digest,))
+
+        if evicted:
+            with transaction(self._db):
+                self._db.executemany("DELETE FROM captures WHERE digest = ?", evicted)
+                self._db.executemany("DELETE FROM blobs WHERE digest = ?", evicted)
+            logger.info("HTML archive evicted %d pages (now %d bytes)", len(evicted), self._total)
+        return len(evicted)
+
+    def prune(self, max_bytes):
+        with self._lock:
+            return self._evict_locked(max_bytes=max_bytes)
+
+    # ---- read ----
+    def captures(self, site=None, keyword=None, since=None):
+        """Capture rows (oldest first) joined with where their blob lives."""
+        sql = (
+            "SELECT c.id, c.site, c.keyword, c.page, c.url, c.fetched_at, c.digest, b.codec "
+            "FROM captures c JOIN blobs b ON b.digest = c.digest WHERE 1 = 1"
+        )
+        params = []
+        if site:
+            sql += " AND c.site = ?"
+            params.append(site)
+        if keyword:
+            sql += " AND c.keyword = ?"
+            params.append(keyword)
+        if since:
+            sql += " AND c.fetched_at >= ?"
+            params.append(since)
+        sql += " ORDER BY c.fetched_at, c.id"
+        with self._lock:
+            rows = self._db.execute(sql, params).fetchall()
+        keys = ("id", "site", "keyword", "page", "url", "fetched_at", "digest", "codec")
+        return [dict(zip(keys, r)) for r in rows]
+
+    def load(self, digest, codec):
+        with open(self.blob_path(digest, codec), "rb") as f:
+            return decompress(f.read(), codec).decode("utf-8")
+
+    def stats(self):
+        with self._lock:
+            blobs, raw, stored = self._db.execute(
+                "SELECT COUNT(*), COALESCE(SUM(raw_size), 0), COALESCE(SUM(stored_size), 0) FROM blobs"
+            ).fetchone()
+            per_site = self._db.execute(
+                "SELECT site, COUNT(*), COUNT(DISTINCT digest), MIN(fetched_at), MAX(fetched_at) "
+                "FROM captures GROUP BY site"
+            ).fetchall()
+        return {
+            "enabled": ARCHIVE_ENABLED,
+            "codec": self.codec,
+            "blobs": blobs,
+            "raw_bytes": raw,
+            "stored_bytes": stored,
+            "compression_ratio": round(raw / stored, 2) if stored else None,
+            "max_bytes": self.max_bytes,
+            "sites": {
+                site: {"captures": n, "distinct_pages": d, "oldest": oldest, "newest": newest}
+                for site, n, d, oldest, newest in per_site
+            },
+        }
+
+
+_archive = None
+_archive_lock = threading.Lock()
+
+
+def get_archive():
+    global _archive
+    if _archive is None:
+        with _archive_lock:
+            if _archive is None:
+                _archive = HtmlArchive()
+    return _archive
+
+
+async def archive_page(page, site, keyword, page_num, url):
+    """Save the page's current HTML. Never raises: archiving must not break a scrape."""
+    if not ARCHIVE_ENABLED:
+        return None
+    try:
+        html = await page.content()
+        return await asyncio.to_thread(get_archive().store, site, keyword, page_num, url, html)
+    except Exception as e:
+        logger.debug("%s: could not archive %s: %s", site, url, e)
+        return None
+
+
+# ------------------------------------------------------------------
+# Offline re-extraction
+# ------------------------------------------------------------------
+def _extract_capture(job):
+    """Worker: decompress one capture and run its site's extractor. Runs in a child process."""
+    capture, path = job
+    from sites import load_site
+
+    try:
+        with open(path, "rb") as f:
+            html = decompress(f.read(), capture["codec"]).decode("utf-8")
+        module = load_site(capture["site"])
+        extracted = module.extract_cards_html(html)
+    except Exception as e:
+        return capture, 0, [], f"{type(e).__name__}: {e}"
+
+    rows = []
+    for card in extracted["cards"]:
+        try:
+            row = module.parse_card(card)
+        except Exception:
+            continue
+        if row:
+            rows.append(row)
+    return capture, len(extracted["cards"]), rows, None
+
+
+def reextract(archive, out, site=None, keyword=None, since=None, jobs=None, latest=False):
+    """
+    Run the site extractors over archived captures, `jobs` processes wide, and
+    write one normalized product per line to `out` (a text stream). Each line
+    carries its capture's keyword, page and time, so the output is a history;
+    with latest=True only the newest row per (site, id) is kept.
+    """
+    from image_proxy import proxied_image_path
+    from records import ProductBatch
+
+    captures = archive.captures(site=site, keyword=keyword, since=since)
+    work = [(c, archive.blob_path(c["digest"], c["codec"])) for c in captures]
+    jobs = jobs or os.cpu_count() or 1
+
+    t0 = time.perf_counter()
+    if jobs == 1 or len(work) < 2:
+        results = map(_extract_capture, work)
+        pool = None
+    else:
+        pool = ProcessPoolExecutor(max_workers=jobs)
+        results = pool.map(_extract_capture, work, chunksize=max(1, len(work) // (jobs * 4)))
+
+    summary = {}
+    latest_rows = {}
+    written = 0
+    try:
+        for capture, n_cards, rows, error in results:
+            s = summary.setdefault(capture["site"], {
+                "captures": 0, "cards": 0, "rows": 0, "empty_captures": [], "errors": [],
+            })
+            s["captures"] += 1
+            s["cards"] += n_cards
+            s["rows"] += len(rows)
+            if error:
+                s["errors"].append({"capture": capture["id"], "error": error})
+            elif not n_cards:
+                # a page with no cards at all is what a broken card selector looks like
+                s["empty_captures"].append(capture["id"])
+            # one batch per capture: each distinct price/discount string is parsed once
+            for record in ProductBatch.from_rows(rows, thumbnail_fn=proxied_image_path).to_dicts():
+                record.update(
+                    capture_id=capture["id"],
+                    keyword=capture["keyword"],
+                    page=capture["page"],
+                    fetched_at=capture["fetched_at"],
+                )
+                if latest:
+                    latest_rows[(record["site"], record["id"] or record["url"])] = record
+                else:
+                    out.write(json.dumps(record, ensure_ascii=False) + "\n")
+                    written += 1
+    finally:
+        if pool is not None:
+            pool.shutdown()
+
+    for record in latest_rows.values():
+        out.write(json.dumps(record, ensure_ascii=False) + "\n")
+        written += 1
+
+    elapsed = time.perf_counter() - t0
+    return {
+        "captures": len(work),
+        "rows_written": written,
+        "jobs": jobs,
+        "seconds": round(elapsed, 2),
+        "pages_per_sec": round(len(work) / elapsed, 1) if elapsed else None,
+        "sites": summary,
+    }
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--dir", default=ARCHIVE_DIR, help="archive directory")
+    sub = ap.add_subparsers(dest="cmd", required=True)
+    sub.add_parser("stats")
+    p = sub.add_parser("prune")
+    p.add_argument("--max-mb", type=float, required=True)
+    p = sub.add_parser("reextract")
+    p.add_argument("--site")
+    p.add_argument("--keyword")
+    p.add_argument("--since", type=float, help="only captures fetched at/after this unix time")
+    p.add_argument("--jobs", type=int, default=None, help="worker processes (default: all cores)")
+    p.add_argument("--latest", action="store_true", help="keep only the newest row per product")
+    p.add_argument("--out", help="JSONL output (default: stdout); the summary goes to stderr")
+    args = ap.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO)
+    archive = HtmlArchive(args.dir)
+    if args.cmd == "stats":
+        print(json.dumps(archive.stats(), indent=2))
+    elif args.cmd == "prune":
+        n = archive.prune(int(args.max_mb * 1024 * 1024))
+        print(json.dumps({"evicted": n, "stored_bytes": archive.total_bytes}, indent=2))
+    else:
+        if args.out:
+            with open(args.out, "w", encoding="utf-8") as out:
+                summary = reextract(archive, out, args.site, args.keyword, args.since, args.jobs, args.latest)
+        else:
+            summary = reextract(archive, sys.stdout, args.site, args.keyword, args.since, args.jobs, args.latest)
+        print(json.dumps(summary, indent=2), file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,395 @@
+# image_proxy.py
+import hashlib
+import io
+import json
+import logging
+import os
+import threading
+import time
+from functools import lru_cache
+from urllib.parse import urljoin, urlparse, quote
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from sqlite_util import connect, transaction
+
+try:
+    from PIL import Image
+except ImportError:  # Pillow is optional; without it thumbnails are stored as fetched
+    Image = None
+
+logger = logging.getLogger(__name__)
+
+
+# --------------------
+# Config
+# --------------------
+CACHE_DIR = os.environ.get(
+    "IMAGE_CACHE_DIR", os.path.join(os.path.dirname(__file__), "image_cache")
+)
+CACHE_MAX_BYTES = int(os.environ.get("IMAGE_CACHE_MAX_BYTES", 256 * 1024 * 1024))
+DEFAULT_WIDTH = 320
+ALLOWED_WIDTHS = (160, 320, 640)
+MAX_SOURCE_BYTES = 8 * 1024 * 1024
+FETCH_TIMEOUT = (5, 15)
+MAX_REDIRECTS = 3
+# Blobs used this recently are never evicted – a request may be about to send
+# one – so the cache can briefly run over CACHE_MAX_BYTES.
+EVICT_GRACE_S = 30
+EVICT_LOW_WATER = 0.9  # once over budget, evict down to this fraction of it
+
+# Only proxy images from the retailers' CDNs, never arbitrary hosts.
+ALLOWED_HOST_SUFFIXES = (
+    "media-amazon.com",
+    "ssl-images-amazon.com",
+    "amazon.in",
+    "flixcart.com",
+    "flipkart.com",
+    "nykaa.com",
+)
+
+_USER_AGENT = (
+    "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 "
+    "(KHTML, like Gecko) Chrome/120.0 Safari/537.36"
+)
+
+
+class ImageProxyError(Exception):
+    """Raised when an image cannot be proxied. `status` is the HTTP code to return."""
+
+    def __init__(self, message, status=502):
+        super().__init__(message)
+        self.status = status
+
+
+# --------------------
+# Helpers
+# --------------------
+def is_allowed_url(url: str) -> bool:
+    if not url:
+        return False
+    parsed = urlparse(url)
+    if parsed.scheme not in ("http", "https") or not parsed.hostname:
+        return False
+    host = parsed.hostname.lower()
+    return any(host == s or host.endswith("." + s) for s in ALLOWED_HOST_SUFFIXES)
+
+
+def clamp_width(width) -> int:
+    try:
+        w = int(width)
+    except (TypeError, ValueError):
+        return DEFAULT_WIDTH
+    # snap to the nearest allowed width so the cache can't be flooded with sizes
+    return min(ALLOWED_WIDTHS, key=lambda a: abs(a - w))
+
+
+# the same product images come back on every page and every run
+@lru_cache(maxsize=8192)
+def proxied_image_path(url, width=DEFAULT_WIDTH):
+    """Relative API path the frontend can use instead of hot-linking `url`."""
+    if not is_allowed_url(url):
+        return None
+    return f"/api/image?url={quote(url, safe='')}&w={clamp_width(width)}"
+
+
+def _make_thumbnail(data: bytes, width: int):
+    """Return (bytes, mimetype). Falls back to the original bytes without Pillow."""
+    if Image is None:
+        return data, None
+    try:
+        with Image.open(io.BytesIO(data)) as im:
+            im = im.convert("RGB")
+            if im.width > width:
+                height = max(1, round(im.height * width / im.width))
+                im = im.resize((width, height), Image.LANCZOS)
+            out = io.BytesIO()
+            im.save(out, format="JPEG", quality=82, optimize=True)
+            return out.getvalue(), "image/jpeg"
+    except Exception:
+        logger.debug("Thumbnail resize failed, storing original bytes", exc_info=True)
+        return data, None
+
+
+# ------------------------------------------------------------------
+# Content-addressed cache
+#   blobs/<aa>/<sha256>  – thumbnail bytes, named by their own digest
+#   index.db             – "<width>:<source url>" -> (digest, mimetype), plus blob sizes
+# Identical images reached through different URLs share one blob.
+# ------------------------------------------------------------------
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS entries (
+    key      TEXT PRIMARY KEY,
+    digest   TEXT NOT NULL,
+    mimetype TEXT
+);
+CREATE INDEX IF NOT EXISTS entries_digest ON entries (digest);
+CREATE TABLE IF NOT EXISTS blobs (
+    digest TEXT PRIMARY KEY,
+    size   INTEGER NOT NULL
+);
+"""
+
+
+class ThumbnailCache:
+    def __init__(self, root=CACHE_DIR, max_bytes=CACHE_MAX_BYTES):
+        self.root = root
+        self.max_bytes = max_bytes
+        self.blob_dir = os.path.join(root, "blobs")
+        self._lock = threading.Lock()
+        os.makedirs(self.blob_dir, exist_ok=True)
+        self._db = connect(os.path.join(root, "index.db"))
+        self._db.executescript(_SCHEMA)
+        self._import_json_index(os.path.join(root, "index.json"))
+        self._drop_missing_blobs()
+        self._total = self._db.execute("SELECT COALESCE(SUM(size), 0) FROM blobs").fetchone()[0]
+
+    @property
+    def total_bytes(self):
+        return self._total
+
+    # ---- index persistence ----
+    def _import_json_index(self, path):
+        """One-off migration from the index.json older versions rewrote on every miss."""
+        if not os.path.exists(path):
+            return
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+            entries = [(k, v["digest"], v.get("mimetype")) for k, v in data.items()]
+        except Exception:
+            logger.error("Failed to read legacy image cache index, ignoring it")
+            entries = []
+        digests = {d for _, d, _ in entries}
+        with transaction(self._db):
+            self._db.executemany("INSERT OR IGNORE INTO entries (key, digest, mimetype) VALUES (?, ?, ?)", entries)
+            self._db.executemany(
+                "INSERT OR IGNORE INTO blobs (digest, size) VALUES (?, ?)",
+                [(d, self._blob_size(d)) for d in digests],
+            )
+        os.remove(path)
+
+    def _drop_missing_blobs(self):
+        gone = [(d,) for (d,) in self._db.execute("SELECT digest FROM blobs")
+                if not os.path.exists(self.blob_path(d))]
+        if gone:
+            self._forget(gone)
+
+    def _forget(self, digests):
+        """Remove index rows for `digests` (a list of 1-tuples)."""
+        with transaction(self._db):
+            self._db.executemany("DELETE FROM entries WHERE digest = ?", digests)
+            self._db.executemany("DELETE FROM blobs WHERE digest = ?", digests)
+
+    # ---- blobs ----
+    def blob_path(self, digest):
+        return os.path.join(self.blob_dir, digest[:2], digest)
+
+    def _blob_size(self, digest):
+        try:
+            return os.path.getsize(self.blob_path(digest))
+        except OSError:
+            return 0
+
+    @staticmethod
+    def key(url, width):
+        return f"{width}:{url}"
+
+    def get(self, url, width):
+        key = self.key(url, width)
+        with self._lock:
+            row = self._db.execute("SELECT digest, mimetype FROM entries WHERE key = ?", (key,)).fetchone()
+        if not row:
+            return None
+        path = self.blob_path(row[0])
+        try:
+            os.utime(path)  # mtime doubles as the LRU clock for eviction
+        except OSError:
+            with self._lock:
+                self._db.execute("DELETE FROM entries WHERE key = ?", (key,))
+            return None
+        return {"digest": row[0], "mimetype": row[1]}
+
+    def put(self, url, width, data, mimetype):
+        digest = hashlib.sha256(data).hexdigest()
+        path = self.blob_path(digest)
+        # written outside the lock: the fresh mtime keeps it inside the eviction
+        # grace window until the index row below exists
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp = f"{path}.{threading.get_ident()}.tmp"
+        with open(tmp, "wb") as f:
+            f.write(data)
+        os.replace(tmp, path)
+
+        with self._lock:
+            with transaction(self._db):
+                added = self._db.execute(
+                    "INSERT OR IGNORE INTO blobs (digest, size) VALUES (?, ?)", (digest, len(data))
+                ).rowcount
+                self._db.execute(
+                    "INSERT OR REPLACE INTO entries (key, digest, mimetype) VALUES (?, ?, ?)",
+                    (self.key(url, width), digest, mimetype),
+                )
+            if added:
+                self._total += len(data)
+            self._evict_locked(keep=digest)
+        return {"digest": digest, "mimetype": mimetype}
+
+    def _evict_locked(self, keep=None):
+        if self._total <= self.max_bytes:
+            return
+        blobs = []
+        for digest, size in self._db.execute("SELECT digest, size FROM blobs"):
+            try:
+                mtime = os.stat(self.blob_path(digest)).st_mtime
+            except OSError:
+                mtime = 0  # already gone: drop the row first
+            blobs.append((mtime, size, digest))
+        blobs.sort()
+
+        # evict down to a low-water mark so the next misses don't each rescan the index
+        target = self.max_bytes * EVICT_LOW_WATER
+        evicted = []
+        recent = time.time() - EVICT_GRACE_S
+        for mtime, size, digest in blobs:
+            if self._total <= target or mtime > recent:
+                break
+            if digest == keep:
+                continue
+            try:
+                os.remove(self.blob_path(digest))
+            except OSError:
+                pass
+            self._total -= size
+            evicted.append((digest,))
+
+        if evicted:
+            self._forget(evicted)
+            logger.info("Image cache evicted %d blobs (now %d bytes)", len(evicted), self._total)
+
+
+# ------------------------------------------------------------------
+# Proxy: pooled fetches + per-URL single-flight
+# ------------------------------------------------------------------
+class ImageProxy:
+    def __init__(self, cache=None, pool_size=16):
+        self.cache = cache or ThumbnailCache()
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size, max_retries=1)
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+        self.session.headers.update({"User-Agent": _USER_AGENT, "Accept": "image/*"})
+
+        self._inflight = {}
+        self._inflight_lock = threading.Lock()
+        self.stats = {"hits": 0, "misses": 0, "coalesced": 0, "errors": 0}
+        self._stats_lock = threading.Lock()
+
+    def _count(self, name):
+        with self._stats_lock:
+            self.stats[name] += 1
+
+    def stats_snapshot(self):
+        with self._stats_lock:
+            return dict(self.stats)
+
+    def _fetch(self, url):
+        # follow redirects by hand so every hop is held to the host allowlist
+        for _ in range(MAX_REDIRECTS + 1):
+            resp = self.session.get(url, timeout=FETCH_TIMEOUT, stream=True, allow_redirects=False)
+            if not resp.is_redirect:
+                return self._read_image(resp)
+            location = resp.headers.get("Location")
+            resp.close()
+            url = urljoin(url, location)
+            if not is_allowed_url(url):
+                raise ImageProxyError("image redirected to a host that is not allowed", 502)
+        raise ImageProxyError("too many redirects", 502)
+
+    @staticmethod
+    def _read_image(resp):
+        try:
+            if resp.status_code != 200:
+                raise ImageProxyError(f"upstream returned {resp.status_code}", 502)
+            ctype = resp.headers.get("Content-Type", "")
+            if ctype and not ctype.startswith("image/"):
+                raise ImageProxyError(f"upstream is not an image ({ctype})", 502)
+            buf = io.BytesIO()
+            for chunk in resp.iter_content(64 * 1024):
+                buf.write(chunk)
+                if buf.tell() > MAX_SOURCE_BYTES:
+                    raise ImageProxyError("upstream image too large", 502)
+            return buf.getvalue(), ctype or "application/octet-stream"
+        finally:
+            resp.close()
+
+    def get(self, url, width=DEFAULT_WIDTH):
+        """
+        Return (path, mimetype, digest) for a cached thumbnail of `url`,
+        fetching it at most once even when many requests ask concurrently.
+        """
+        if not is_allowed_url(url):
+            raise ImageProxyError("image host not allowed", 400)
+        width = clamp_width(width)
+
+        entry = self.cache.get(url, width)
+        if entry:
+            self._count("hits")
+            return self.cache.blob_path(entry["digest"]), entry["mimetype"], entry["digest"]
+
+        key = ThumbnailCache.key(url, width)
+        with self._inflight_lock:
+            waiter = self._inflight.get(key)
+            leader = waiter is None
+            if leader:
+                waiter = {"event": threading.Event(), "entry": None, "error": None}
+                self._inflight[key] = waiter
+
+        if not leader:
+            self._count("coalesced")
+            waiter["event"].wait(sum(FETCH_TIMEOUT) + 5)
+            if waiter["error"] is not None:
+                raise waiter["error"]
+            entry = waiter["entry"]
+            if not entry:
+                raise ImageProxyError("image fetch timed out", 504)
+            return self.cache.blob_path(entry["digest"]), entry["mimetype"], entry["digest"]
+
+        try:
+            self._count("misses")
+            t0 = time.perf_counter()
+            raw, upstream_type = self._fetch(url)
+            thumb, thumb_type = _make_thumbnail(raw, width)
+            entry = self.cache.put(url, width, thumb, thumb_type or upstream_type)
+            waiter["entry"] = entry
+            logger.info(
+                "Image proxy fetched %s (%d -> %d bytes) in %.0f ms",
+                url, len(raw), len(thumb), (time.perf_counter() - t0) * 1000,
+            )
+            return self.cache.blob_path(entry["digest"]), entry["mimetype"], entry["digest"]
+        except ImageProxyError as e:
+            self._count("errors")
+            waiter["error"] = e
+            raise
+        except Exception as e:
+            self._count("errors")
+            waiter["error"] = ImageProxyError(str(e), 502)
+            raise waiter["error"] from e
+        finally:
+            with self._inflight_lock:
+                self._inflight.pop(key, None)
+            waiter["event"].set()
+
+
+_proxy = None
+_proxy_lock = threading.Lock()
+
+
+def get_image_proxy():
+    global _proxy
+    if _proxy is None:
+        with _proxy_lock:
+            if _proxy is None:
+                _proxy = ImageProxy()
+    return _proxy
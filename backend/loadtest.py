@@ -0,0 +1,330 @@
+# loadtest.py
+"""
+End-to-end load test for the Flask API.
+
+Runs the real app in-process (werkzeug, threaded) with the scraper sites
+replaced by stubs of configurable latency / item count, then drives it with an
+open-loop async load generator: requests arrive as a Poisson process at
+--rate per second, at most --concurrency are in flight, and latency is measured
+from each request's scheduled arrival so queueing is not hidden.
+
+    python loadtest.py --duration 30 --rate 40 --concurrency 32 \\
+        --mix scrape=1,subscribe=1,alerts=4 --stub-latency 0.5 --stub-items 24 \\
+        --out loadtest.json
+
+    python loadtest.py --url http://127.0.0.1:5000 ...   # against a running server
+
+By default the stub-backed app runs in a child process, so the load generator
+and the server do not compete for one GIL; --in-process keeps both in this
+process (only useful for debugging the harness itself).
+
+The JSON report (per endpoint p50/p95/p99, throughput, error rate, plus the git
+commit and configuration) is stable for diffing across commits.
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import signal
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from types import SimpleNamespace
+from urllib.parse import urlparse
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+
+# ------------------------------------------------------------------
+# Stub sites
+# ------------------------------------------------------------------
+def make_stub_site(name, latency_s=0.5, items=24, error_rate=0.0, jitter=0.2):
+    """A site object the registry accepts: NAME, DEFAULTS and an async scrape()."""
+
+    async def scrape(keyword="laptop", max_products=items, **_):
+        await asyncio.sleep(max(0.0, random.gauss(latency_s, latency_s * jitter)))
+        if error_rate and random.random() < error_rate:
+            raise RuntimeError(f"{name} stub failure")
+        n = min(items, max_products)
+        return [
+            {
+                "site": name,
+                "ID": f"{name}-{i}",
+                "Title": f"{keyword} stub product {i}",
+                "Price": f"{1000 + i * 37:,}",
+                "OriginalPrice": f"{1500 + i * 41:,}",
+                "DiscountPercent": float(i % 60),
+                "DiscountSource": "scraped_badge",
+                "URL": f"https://stub.invalid/{name}/{i}",
+                "image": None,
+            }
+            for i in range(n)
+        ]
+
+    return SimpleNamespace(NAME=name, DEFAULTS={"max_products": items}, scrape=scrape)
+
+
+def start_app_server(stub_latency, stub_items, stub_error_rate, port=0):
+    """Start app.py on a background thread with stub sites; return (base_url, shutdown)."""
+    sys.path.insert(0, HERE)
+    from werkzeug.serving import make_server
+
+    import app as app_module
+    import delivery
+    import sites
+
+    for name in list(sites.available_sites()):
+        sites.register_site(make_stub_site(name, stub_latency, stub_items, stub_error_rate))
+
+    # never touch the real alerts.json
+    tmp = tempfile.NamedTemporaryFile(prefix="alerts-", suffix=".json", delete=False)
+    tmp.write(b"[]")
+    tmp.close()
+    app_module.ALERTS_FILE = tmp.name
+    delivery.OUTBOX_FILE = tmp.name + ".outbox.db"
+
+    server = make_server("127.0.0.1", port, app_module.app, threaded=True)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+
+    def shutdown():
+        server.shutdown()
+        outbox = delivery.OUTBOX_FILE
+        for path in (tmp.name, outbox, outbox + "-wal", outbox + "-shm"):
+            try:
+                os.unlink(path)
+            except OSError:
+                pass
+
+    return f"http://127.0.0.1:{server.server_port}", shutdown
+
+
+def serve_stub_app(stub_latency, stub_items, stub_error_rate, port=0):
+    """Child-process entry: serve the stub-backed app until SIGTERM, announcing the URL on stdout."""
+    base_url, shutdown = start_app_server(stub_latency, stub_items, stub_error_rate, port)
+    stop = threading.Event()
+    signal.signal(signal.SIGTERM, lambda *_: stop.set())
+    print(base_url, flush=True)
+    try:
+        stop.wait()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        shutdown()
+
+
+def spawn_app_server(stub_latency, stub_items, stub_error_rate, timeout=30):
+    """Start the stub-backed app in a child process; return (base_url, shutdown)."""
+    proc = subprocess.Popen(
+        [sys.executable, os.path.abspath(__file__), "--serve-stub",
+         "--stub-latency", str(stub_latency), "--stub-items", str(stub_items),
+         "--stub-error-rate", str(stub_error_rate)],
+        cwd=HERE, stdout=subprocess.PIPE, text=True,
+    )
+    ready = {}
+    reader = threading.Thread(target=lambda: ready.update(url=proc.stdout.readline().strip()), daemon=True)
+    reader.start()
+    reader.join(timeout)
+    if not ready.get("url"):
+        proc.kill()
+        raise RuntimeError("stub app server did not start")
+
+    def shutdown():
+        proc.terminate()
+        try:
+            proc.wait(10)
+        except subprocess.TimeoutExpired:
+            proc.kill()
+
+    return ready["url"], shutdown
+
+
+# ------------------------------------------------------------------
+# Minimal asyncio HTTP/1.1 client (stdlib only, one connection per request)
+# ------------------------------------------------------------------
+async def http_request(base_url, method, path, body=None, timeout=60):
+    u = urlparse(base_url)
+    payload = json.dumps(body).encode() if body is not None else b""
+    reader, writer = await asyncio.wait_for(
+        asyncio.open_connection(u.hostname, u.port or 80), timeout
+    )
+    try:
+        head = (
+            f"{method} {path} HTTP/1.1\r\n"
+            f"Host: {u.netloc}\r\n"
+            "Connection: close\r\n"
+            "Content-Type: application/json\r\n"
+            f"Content-Length: {len(payload)}\r\n\r\n"
+        )
+        writer.write(head.encode() + payload)
+        await writer.drain()
+        raw = await asyncio.wait_for(reader.read(), timeout)
+    finally:
+        writer.close()
+        try:
+            await writer.wait_closed()
+        except Exception:
+            pass
+    status_line = raw.split(b"\r\n", 1)[0].decode(errors="replace")
+    return int(status_line.split()[1])
+
+
+# ------------------------------------------------------------------
+# Scenarios
+# ------------------------------------------------------------------
+def _scenarios(max_products):
+    return {
+        "scrape": lambda: ("POST", "/api/scrape", {"keyword": "laptop", "max_products": max_products}),
+        "subscribe": lambda: ("POST", "/api/subscribe", {
+            "keyword": "laptop",
+            "discount": "30%",
+            "method": "Email",
+            "contact": f"load{random.randrange(10 ** 6)}@example.com",
+            "product": {"title": "Load test product", "url": "https://stub.invalid/p", "site": "amazon"},
+        }),
+        "alerts": lambda: ("GET", "/api/alerts", None),
+    }
+
+
+def parse_mix(spec):
+    mix = {}
+    for part in spec.split(","):
+        name, _, weight = part.partition("=")
+        mix[name.strip()] = float(weight or 1)
+    return mix
+
+
+def _percentile(sorted_vals, pct):
+    if not sorted_vals:
+        return None
+    k = (len(sorted_vals) - 1) * pct / 100
+    lo = int(k)
+    hi = min(lo + 1, len(sorted_vals) - 1)
+    return sorted_vals[lo] + (sorted_vals[hi] - sorted_vals[lo]) * (k - lo)
+
+
+def summarize(samples, duration):
+    out = {}
+    for name in sorted(samples):
+        lat = sorted(s[0] for s in samples[name])
+        errors = sum(1 for s in samples[name] if not s[1])
+        n = len(lat)
+        out[name] = {
+            "requests": n,
+            "errors": errors,
+            "error_rate": round(errors / n, 4) if n else None,
+            "throughput_rps": round((n - errors) / duration, 2) if duration else None,
+            "latency_ms": {
+                "p50": round(_percentile(lat, 50) * 1000, 1) if n else None,
+                "p95": round(_percentile(lat, 95) * 1000, 1) if n else None,
+                "p99": round(_percentile(lat, 99) * 1000, 1) if n else None,
+                "mean": round(sum(lat) / n * 1000, 1) if n else None,
+                "max": round(lat[-1] * 1000, 1) if n else None,
+            },
+        }
+    return out
+
+
+async def generate_load(base_url, duration, rate, concurrency, mix, max_products, seed=1):
+    rnd = random.Random(seed)
+    scenarios = _scenarios(max_products)
+    unknown = set(mix) - set(scenarios)
+    if unknown:
+        raise ValueError(f"unknown scenarios: {sorted(unknown)}")
+    names, weights = list(mix), list(mix.values())
+
+    sem = asyncio.Semaphore(concurrency)
+    samples = {n: [] for n in names}
+    tasks = []
+
+    async def one(name, scheduled):
+        method, path, body = scenarios[name]()
+        async with sem:
+            try:
+                status = await http_request(base_url, method, path, body)
+                ok = 200 <= status < 300
+            except Exception:
+                ok = False
+        samples[name].append((time.perf_counter() - scheduled, ok))
+
+    start = time.perf_counter()
+    next_at = start
+    while next_at - start < duration:
+        now = time.perf_counter()
+        if next_at > now:
+            await asyncio.sleep(next_at - now)
+        name = rnd.choices(names, weights)[0]
+        tasks.append(asyncio.ensure_future(one(name, next_at)))
+        next_at += rnd.expovariate(rate)
+
+    await asyncio.gather(*tasks)
+    elapsed = time.perf_counter() - start
+    return samples, elapsed
+
+
+def _git_commit():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=HERE, capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except Exception:
+        return None
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--url", help="target a running server instead of starting one with stub sites")
+    ap.add_argument("--duration", type=float, default=20.0, help="seconds of load")
+    ap.add_argument("--rate", type=float, default=20.0, help="mean arrivals per second")
+    ap.add_argument("--concurrency", type=int, default=16, help="max requests in flight")
+    ap.add_argument("--mix", default="scrape=1,subscribe=1,alerts=2", help="scenario weights")
+    ap.add_argument("--max-products", type=int, default=12)
+    ap.add_argument("--stub-latency", type=float, default=0.5, help="seconds per stub site call")
+    ap.add_argument("--stub-items", type=int, default=24, help="items returned per stub site")
+    ap.add_argument("--stub-error-rate", type=float, default=0.0)
+    ap.add_argument("--seed", type=int, default=1)
+    ap.add_argument("--in-process", action="store_true",
+                    help="run the stub app in this process instead of a child (shares the GIL)")
+    ap.add_argument("--serve-stub", action="store_true", help=argparse.SUPPRESS)
+    ap.add_argument("--out", help="write the JSON report here (default: stdout)")
+    args = ap.parse_args(argv)
+
+    if args.serve_stub:
+        return serve_stub_app(args.stub_latency, args.stub_items, args.stub_error_rate)
+
+    shutdown = None
+    base_url = args.url
+    if not base_url:
+        start = start_app_server if args.in_process else spawn_app_server
+        base_url, shutdown = start(args.stub_latency, args.stub_items, args.stub_error_rate)
+
+    try:
+        samples, elapsed = asyncio.run(generate_load(
+            base_url, args.duration, args.rate, args.concurrency,
+            parse_mix(args.mix), args.max_products, args.seed,
+        ))
+    finally:
+        if shutdown:
+            shutdown()
+
+    report = {
+        "commit": _git_commit(),
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+        "config": {k: v for k, v in vars(args).items() if k not in ("out", "serve_stub")},
+        "elapsed_s": round(elapsed, 2),
+        "endpoints": summarize(samples, elapsed),
+    }
+    text = json.dumps(report, indent=2, sort_keys=True)
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as f:
+            f.write(text + "\n")
+    else:
+        print(text)
+    return report
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,274 @@
+# memory.py
+import logging
+import os
+import threading
+import time
+import tracemalloc
+
+try:
+    import psutil
+except ImportError:  # psutil is optional; without it USS is read from /proc (Linux only)
+    psutil = None
+
+logger = logging.getLogger(__name__)
+
+
+# --------------------
+# Config
+# --------------------
+# Recycle the browser context after this many search pages (0 = never by count).
+RECYCLE_AFTER_PAGES = int(os.environ.get("SCRAPE_RECYCLE_PAGES", 3))
+# ...or as soon as this scrape's browser uses more than this many MB (0 = never by memory).
+RECYCLE_MEMORY_MB = int(os.environ.get("SCRAPE_RECYCLE_MEMORY_MB", 0))
+# Hard ceiling: stop the scrape (keeping what was collected) above this many MB (0 = none).
+MEMORY_CEILING_MB = int(os.environ.get("SCRAPE_MEMORY_CEILING_MB", 0))
+# tracemalloc slows Python allocations down, so it is opt-in.
+TRACEMALLOC = os.environ.get("SCRAPE_TRACEMALLOC", "") not in ("", "0")
+
+MB = 1024 * 1024
+
+
+class MemoryCeilingExceeded(Exception):
+    """The browser stayed above the configured ceiling even after recycling the context."""
+
+
+# --------------------
+# Per-process memory
+# --------------------
+def _proc_uss(pid):
+    # USS = pages private to the process; Chromium's shared pages would be
+    # counted once per process by RSS
+    try:
+        with open(f"/proc/{pid}/smaps_rollup", "r") as f:
+            return sum(
+                int(line.split()[1]) * 1024
+                for line in f
+                if line.startswith(("Private_Clean:", "Private_Dirty:"))
+            )
+    except (OSError, ValueError):
+        return 0
+
+
+def process_uss(pid):
+    """Unique set size of `pid` in bytes (0 if it is gone or not readable)."""
+    if psutil is not None:
+        try:
+            return psutil.Process(pid).memory_full_info().uss
+        except (psutil.NoSuchProcess, psutil.AccessDenied, psutil.ZombieProcess):
+            return 0
+        except Exception:
+            pass
+    return _proc_uss(pid)
+
+
+async def browser_pids(cdp):
+    """PIDs of every process of one Chromium instance (browser, renderers, GPU, utilities)."""
+    info = await cdp.send("SystemInfo.getProcessInfo")
+    return [p["id"] for p in info.get("processInfo", []) if p.get("id")]
+
+
+# ------------------------------------------------------------------
+# Per-scrape monitor
+# ------------------------------------------------------------------
+_last_reports = {}
+_reports_lock = threading.Lock()
+
+# tracemalloc is process-wide: it runs while any monitor is active and its
+# peak is reset when the first of a set of overlapping scrapes starts.
+_tracing_monitors = 0
+_own_tracemalloc = False
+_tracemalloc_lock = threading.Lock()
+
+
+def _tracemalloc_enter():
+    global _tracing_monitors, _own_tracemalloc
+    with _tracemalloc_lock:
+        if _tracing_monitors == 0:
+            if not tracemalloc.is_tracing():
+                tracemalloc.start()
+                _own_tracemalloc = True
+            else:
+                tracemalloc.reset_peak()
+        _tracing_monitors += 1
+
+
+def _tracemalloc_exit():
+    global _tracing_monitors, _own_tracemalloc
+    with _tracemalloc_lock:
+        _tracing_monitors -= 1
+        report = None
+        if tracemalloc.is_tracing():
+            current, peak = tracemalloc.get_traced_memory()
+            report = {"py_heap_current_mb": round(current / MB, 2), "py_heap_peak_mb": round(peak / MB, 2)}
+        if _tracing_monitors == 0 and _own_tracemalloc:
+            tracemalloc.stop()
+            _own_tracemalloc = False
+        return report
+
+
+def last_reports():
+    with _reports_lock:
+        return dict(_last_reports)
+
+
+class MemoryMonitor:
+    """
+    Samples this scrape's browser memory after every page and keeps the peak.
+
+    Only the processes of the scrape's own Chromium are counted (found through
+    CDP), by USS, so concurrent scrapes never trip each other's recycling or
+    ceiling. The Python heap figures (SCRAPE_TRACEMALLOC) are process-wide and
+    cover every scrape that overlapped with this one.
+    """
+
+    def __init__(self, site, ceiling_mb=MEMORY_CEILING_MB):
+        self.site = site
+        self.ceiling = ceiling_mb * MB if ceiling_mb else None
+        self.started = time.time()
+        self.peak = 0
+        self.last = None
+        self.pages = 0
+        self.recycles = 0
+        self._browser = None
+        self._cdp = None
+        self._tracing = TRACEMALLOC
+        if self._tracing:
+            _tracemalloc_enter()
+
+    async def attach(self, browser):
+        """Measure `browser` from now on (needs Chromium; otherwise sampling reports None)."""
+        self._browser = browser
+        try:
+            self._cdp = await browser.new_browser_cdp_session()
+        except Exception as e:
+            logger.debug("%s: no CDP session for memory sampling: %s", self.site, e)
+            self._cdp = None
+
+    async def sample(self):
+        """Bytes used by this scrape's browser processes, or None if they cannot be found."""
+        if self._cdp is None:
+            return None
+        try:
+            pids = await browser_pids(self._cdp)
+        except Exception as e:
+            logger.debug("%s: memory sample failed: %s", self.site, e)
+            return None
+        used = sum(process_uss(pid) for pid in pids)
+        self.last = used
+        self.peak = max(self.peak, used)
+        return used
+
+    def over_ceiling(self, used):
+        return self.ceiling is not None and used is not None and used > self.ceiling
+
+    def finish(self, items=0):
+        report = {
+            "site": self.site,
+            "items": items,
+            "pages": self.pages,
+            "recycles": self.recycles,
+            "seconds": round(time.time() - self.started, 2),
+            "metric": "browser_uss" if self._cdp is not None else None,
+            "browser_peak_mb": round(self.peak / MB, 1) if self._cdp is not None else None,
+            "browser_last_mb": round(self.last / MB, 1) if self.last is not None else None,
+            "ceiling_mb": round(self.ceiling / MB) if self.ceiling else None,
+        }
+        if self._tracing:
+            self._tracing = False
+            report.update(_tracemalloc_exit() or {})
+        with _reports_lock:
+            _last_reports[self.site] = report
+        logger.info("%s memory: browser peak %s MB over %d pages (%d recycles)",
+                    self.site, report["browser_peak_mb"], self.pages, self.recycles)
+        return report
+
+
+# ------------------------------------------------------------------
+# Context / page recycling
+# ------------------------------------------------------------------
+class PageRecycler:
+    """
+    Owns the scraping context and page for one browser.
+
+    Call `before_page()` before loading each search page and `page_done()` after
+    extracting it. Once the page count or memory threshold is reached the context is
+    closed (dropping every DOM node and handle the browser still holds) and a
+    fresh one is opened before the next page.
+    """
+
+    def __init__(self, browser, monitor, context_kwargs=None, storage_state=None, on_recycle=None,
+                 max_pages=RECYCLE_AFTER_PAGES, max_memory_mb=RECYCLE_MEMORY_MB):
+        self.browser = browser
+        self.monitor = monitor
+        self.context_kwargs = dict(context_kwargs or {})
+        # callable returning a storage_state path (or None); re-read for every new context
+        self.storage_state = storage_state
+        self.on_recycle = on_recycle
+        self.max_pages = max_pages
+        self.max_memory = max_memory_mb * MB if max_memory_mb else None
+        self.context = None
+        self.page = None
+        self.warm = False
+        self._pages_in_context = 0
+
+    async def open(self):
+        if self.monitor._browser is None:
+            await self.monitor.attach(self.browser)
+        kwargs = dict(self.context_kwargs)
+        if self.storage_state is not None:
+            kwargs["storage_state"] = self.storage_state()
+        self.warm = kwargs.get("storage_state") is not None
+        self.context = await self.browser.new_context(**kwargs)
+        self.page = await self.context.new_page()
+        self._pages_in_context = 0
+        return self.page
+
+    async def recycle(self, reason):
+        if self.on_recycle is not None:
+            # e.g. persist cookies so the fresh context starts warm
+            try:
+                await self.on_recycle(self.context)
+            except Exception as e:
+                logger.debug("on_recycle hook failed: %s", e)
+        await self.close()
+        self.monitor.recycles += 1
+        logger.info("%s: recycled browser context (%s)", self.monitor.site, reason)
+        return await self.open()
+
+    async def before_page(self):
+        """Call at the top of every search-page iteration; returns the page to use."""
+        if self.page is None:
+            return await self.open()
+        if self._pages_in_context == 0:
+            return self.page
+
+        used = await self.monitor.sample()
+        if self.monitor.over_ceiling(used):
+            await self.recycle(f"browser {used / MB:.0f} MB over ceiling")
+            used = await self.monitor.sample()
+            if self.monitor.over_ceiling(used):
+                raise MemoryCeilingExceeded(
+                    f"{self.monitor.site}: browser uses {used / MB:.0f} MB, over the ceiling of "
+                    f"{self.monitor.ceiling / MB:.0f} MB"
+                )
+        elif self.max_memory is not None and used is not None and used > self.max_memory:
+            await self.recycle(f"browser {used / MB:.0f} MB")
+        elif self.max_pages and self._pages_in_context >= self.max_pages:
+            await self.recycle(f"{self._pages_in_context} pages")
+        return self.page
+
+    async def page_done(self):
+        self.monitor.pages += 1
+        self._pages_in_context += 1
+        await self.monitor.sample()
+
+    async def close(self):
+        for obj in (self.page, self.context):
+            if obj is None:
+                continue
+            try:
+                await obj.close()
+            except Exception:
+                pass
+        self.page = None
+        self.context = None
@@ -0,0 +1,298 @@
+# navigation.py
+import asyncio
+import logging
+import random
+import threading
+import time
+from collections import deque
+from urllib.parse import urlparse
+
+logger = logging.getLogger(__name__)
+
+
+# --------------------
+# Config
+# --------------------
+MIN_TIMEOUT_MS = 15000
+MAX_TIMEOUT_MS = 90000
+DEFAULT_TIMEOUT_MS = 45000
+LATENCY_WINDOW = 50          # recent successful navigations kept per site
+TIMEOUT_P95_MULTIPLIER = 3   # allow 3x the recent p95 before giving up
+
+FAILURE_THRESHOLD = 3        # consecutive failures before the breaker opens
+RESET_TIMEOUT_S = 120        # how long an open breaker rejects before a probe
+
+BACKOFF_BASE_S = 1.0
+BACKOFF_CAP_S = 8.0
+
+# Markers of bot walls / CAPTCHA interstitials on the supported sites.
+BLOCK_PATH_MARKERS = ("captcha", "/errors/", "/blocked")
+BLOCK_TITLE_MARKERS = ("robot check", "access denied", "captcha", "are you a human", "request blocked")
+BLOCK_BODY_MARKERS = (
+    "enter the characters you see below",
+    "type the characters you see in this image",
+    "unusual traffic from your computer",
+    "are you a human",
+    "verify you are human",
+    "access denied",
+    "request unsuccessful",
+)
+
+
+class NavigationError(Exception):
+    """Navigation to a page failed after all retries."""
+
+
+class BlockedError(NavigationError):
+    """The site served a block or CAPTCHA page instead of content."""
+
+
+class CircuitOpenError(NavigationError):
+    """The site's circuit breaker is open; the request was rejected without navigating."""
+
+
+# ------------------------------------------------------------------
+# Per-site latency percentiles -> adaptive timeout
+# ------------------------------------------------------------------
+class LatencyTracker:
+    def __init__(self, window=LATENCY_WINDOW):
+        self._samples = deque(maxlen=window)
+        self._lock = threading.Lock()
+
+    def record(self, seconds):
+        with self._lock:
+            self._samples.append(seconds)
+
+    def percentile(self, pct):
+        with self._lock:
+            data = sorted(self._samples)
+        if not data:
+            return None
+        idx = min(len(data) - 1, max(0, round(pct / 100 * (len(data) - 1))))
+        return data[idx]
+
+    def timeout_ms(self):
+        with self._lock:
+            enough = len(self._samples) >= 5
+        if not enough:
+            return DEFAULT_TIMEOUT_MS
+        p95 = self.percentile(95)
+        return int(min(MAX_TIMEOUT_MS, max(MIN_TIMEOUT_MS, p95 * 1000 * TIMEOUT_P95_MULTIPLIER)))
+
+    def snapshot(self):
+        p50, p95 = self.percentile(50), self.percentile(95)
+        return {
+            "samples": len(self._samples),
+            "p50_s": round(p50, 3) if p50 is not None else None,
+            "p95_s": round(p95, 3) if p95 is not None else None,
+            "timeout_ms": self.timeout_ms(),
+        }
+
+
+# ------------------------------------------------------------------
+# Circuit breaker: closed -> open (after N failures) -> half_open (one probe)
+# ------------------------------------------------------------------
+class CircuitBreaker:
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(self, site, failure_threshold=FAILURE_THRESHOLD, reset_timeout=RESET_TIMEOUT_S):
+        self.site = site
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.state = self.CLOSED
+        self.failures = 0
+        self.opened_at = None
+        self.last_error = None
+        self._probe_in_flight = False
+        self._lock = threading.Lock()
+
+    def reject_if_open(self):
+        """Cheap pre-flight: raise while open, without claiming the half-open probe."""
+        with self._lock:
+            if self.state == self.OPEN and time.monotonic() - self.opened_at < self.reset_timeout:
+                raise CircuitOpenError(f"{self.site} circuit open: {self.last_error}")
+
+    def check(self):
+        """Raise CircuitOpenError unless a request may go through right now."""
+        with self._lock:
+            if self.state == self.CLOSED:
+                return
+            if self.state == self.OPEN:
+                if time.monotonic() - self.opened_at < self.reset_timeout:
+                    raise CircuitOpenError(f"{self.site} circuit open: {self.last_error}")
+                self.state = self.HALF_OPEN
+                self._probe_in_flight = False
+            # HALF_OPEN: exactly one probe at a time
+            if self._probe_in_flight:
+                raise CircuitOpenError(f"{self.site} circuit half-open, probe in progress")
+            self._probe_in_flight = True
+
+    def record_success(self):
+        with self._lock:
+            if self.state != self.CLOSED:
+                logger.info("Circuit for %s closed after successful probe", self.site)
+            self.state = self.CLOSED
+            self.failures = 0
+            self.opened_at = None
+            self._probe_in_flight = False
+
+    def record_failure(self, error):
+        with self._lock:
+            self.failures += 1
+            self.last_error = str(error)[:200]
+            self._probe_in_flight = False
+            if self.state == self.HALF_OPEN or self.failures >= self.failure_threshold:
+                if self.state != self.OPEN:
+                    logger.warning("Circuit for %s opened after %d failures: %s",
+                                   self.site, self.failures, self.last_error)
+                self.state = self.OPEN
+                self.opened_at = time.monotonic()
+
+    def abandon(self):
+        """A probe was cancelled without an outcome; let the next caller probe."""
+        with self._lock:
+            self._probe_in_flight = False
+
+    def reset(self):
+        self.record_success()
+
+    def snapshot(self):
+        with self._lock:
+            retry_in = None
+            if self.state == self.OPEN:
+                retry_in = max(0.0, self.reset_timeout - (time.monotonic() - self.opened_at))
+            return {
+                "state": self.state,
+                "failures": self.failures,
+                "last_error": self.last_error,
+                "retry_in_s": round(retry_in, 1) if retry_in is not None else None,
+            }
+
+
+_breakers = {}
+_latency = {}
+_registry_lock = threading.Lock()
+
+
+def breaker_for(site):
+    with _registry_lock:
+        if site not in _breakers:
+            _breakers[site] = CircuitBreaker(site)
+        return _breakers[site]
+
+
+def latency_for(site):
+    with _registry_lock:
+        if site not in _latency:
+            _latency[site] = LatencyTracker()
+        return _latency[site]
+
+
+def navigation_status():
+    with _registry_lock:
+        sites = sorted(set(_breakers) | set(_latency))
+    return {
+        site: {"breaker": breaker_for(site).snapshot(), "latency": latency_for(site).snapshot()}
+        for site in sites
+    }
+
+
+# --------------------
+# Navigation
+# --------------------
+def _playwright_error():
+    # imported lazily so the API can report breaker state without loading Playwright
+    from playwright.async_api import Error
+    return Error
+
+
+async def detect_block(page):
+    """Return a short reason string if `page` is a block/CAPTCHA page, else None."""
+    PlaywrightError = _playwright_error()
+    # only the path – the query string carries the user's search keyword
+    path = urlparse(page.url or "").path.lower()
+    for marker in BLOCK_PATH_MARKERS:
+        if marker in path:
+            return f"url path contains {marker!r}"
+    try:
+        title = (await page.title() or "").lower()
+    except PlaywrightError:
+        title = ""
+    for marker in BLOCK_TITLE_MARKERS:
+        if marker in title:
+            return f"title contains {marker!r}"
+    try:
+        body = await page.evaluate(
+            "() => document.body ? document.body.innerText.slice(0, 4000).toLowerCase() : ''"
+        )
+    except PlaywrightError:
+        body = ""
+    for marker in BLOCK_BODY_MARKERS:
+        if marker in body:
+            return f"page text contains {marker!r}"
+    return None
+
+
+def _backoff(attempt):
+    # "full jitter": uniform over [0, min(cap, base * 2^attempt)]
+    return random.uniform(0, min(BACKOFF_CAP_S, BACKOFF_BASE_S * (2 ** attempt)))
+
+
+async def navigate(page, site, url, max_attempts=3, wait_until="load", timeout_ms=None):
+    """
+    Navigate `page` to `url` through `site`'s circuit breaker.
+
+    The timeout adapts to the site's recent latency (unless `timeout_ms` fixes
+    it), failed attempts are retried with jittered exponential backoff, and
+    block/CAPTCHA pages count as failures (without retrying – another hit
+    straight away rarely helps).
+
+    `site` is the breaker/latency key. Best-effort side fetches should use
+    their own key (e.g. "nykaa:detail") so their failures and timings never
+    trip or skew the breaker guarding the search pages.
+    """
+    breaker = breaker_for(site)
+    latency = latency_for(site)
+    breaker.check()
+    try:
+        await _navigate(page, site, url, breaker, latency, max_attempts, wait_until, timeout_ms)
+    except NavigationError:
+        raise
+    except Exception as e:
+        breaker.record_failure(e)
+        raise
+    except BaseException:
+        breaker.abandon()
+        raise
+
+
+async def _navigate(page, site, url, breaker, latency, max_attempts, wait_until, timeout_ms=None):
+    PlaywrightError = _playwright_error()
+    last_exc = None
+    for attempt in range(1, max_attempts + 1):
+        timeout = timeout_ms or latency.timeout_ms()
+        t0 = time.perf_counter()
+        try:
+            await page.goto(url, timeout=timeout, wait_until=wait_until)
+        except PlaywrightError as e:
+            last_exc = e
+            logger.warning("Navigation attempt %d/%d failed for %s (timeout %d ms): %r",
+                           attempt, max_attempts, url, timeout, e)
+            if attempt < max_attempts:
+                await asyncio.sleep(_backoff(attempt))
+            continue
+
+        latency.record(time.perf_counter() - t0)
+        reason = await detect_block(page)
+        if reason:
+            err = BlockedError(f"{site} served a block page for {url}: {reason}")
+            breaker.record_failure(err)
+            raise err
+        breaker.record_success()
+        return
+
+    err = NavigationError(f"{site}: failed to load {url} after {max_attempts} attempts: {last_exc!r}")
+    breaker.record_failure(err)
+    raise err from last_exc
@@ -0,0 +1,239 @@
+# records.py
+"""
+Compact product records.
+
+`product_dict` is what `normalize_row` returns for one scraped row.
+`ProductRecord` is the same shape as a `__slots__` class instead of a dict,
+so a few hundred thousand of them stay small.
+
+`ProductBatch` is the column-oriented form for history replays and batch
+runs: text columns are plain lists, numeric columns are `array('d')` with NaN
+for missing values, and `from_rows` parses each distinct price/discount
+string once per batch instead of once per row.
+"""
+import math
+import re
+from array import array
+
+from scrapers import parse_price_to_number
+
+_NUMBER_RE = re.compile(r"(\d+(\.\d+)?)")
+
+NAN = float("nan")
+
+TEXT_FIELDS = (
+    "id",
+    "site",
+    "title",
+    "price_text",
+    "original_price_text",
+    "discount_source",
+    "url",
+    "image",
+    "thumbnail",
+)
+
+
+# --------------------
+# Row access helpers
+# --------------------
+def _as_dict(row):
+    if isinstance(row, dict):
+        return row
+    try:
+        return dict(row)
+    except Exception:
+        try:
+            return row.to_dict()
+        except Exception:
+            return {}
+
+
+def _raw_fields(d):
+    """Pull the loosely-named scraper/legacy keys out of one row."""
+    get = d.get
+    return (
+        (get("site") or "").lower(),
+        get("Title") or get("title") or "",
+        get("Price") or get("price") or "",
+        get("OriginalPrice") or get("original_price") or get("Original Price") or "",
+        get("DiscountSource") or get("discount_source"),
+        get("URL") or get("Product Link") or get("link") or get("url"),
+        get("image") or get("img") or get("thumbnail"),
+        get("DiscountPercent") or get("discount_percent") or get("discount"),
+        get("ID") or get("id"),
+    )
+
+
+def parse_discount(dp):
+    if dp.__class__ is float:
+        return dp
+    if isinstance(dp, (int, float)):
+        return float(dp)
+    m = _NUMBER_RE.search(str(dp))
+    return float(m.group(1)) if m else None
+
+
+def product_dict(row, thumbnail_fn=None):
+    """Normalized dict for one row, built directly (no ProductRecord round trip)."""
+    site, title, price, orig, source, url, image, dp, pid = _raw_fields(_as_dict(row))
+    return {
+        "id": pid,
+        "site": site,
+        "title": title,
+        "price_text": price,
+        "original_price_text": orig,
+        "discount_percent": parse_discount(dp),
+        "discount_source": source,
+        "url": url,
+        "image": image,
+        "thumbnail": thumbnail_fn(image) if thumbnail_fn else None,
+    }
+
+
+# ------------------------------------------------------------------
+# Single record
+# ------------------------------------------------------------------
+class ProductRecord:
+    __slots__ = TEXT_FIELDS + ("discount_percent",)
+
+    def __init__(self, site="", title="", price_text="", original_price_text="",
+                 discount_percent=None, discount_source=None, url=None, image=None, thumbnail=None,
+                 id=None):
+        self.id = id
+        self.site = site
+        self.title = title
+        self.price_text = price_text
+        self.original_price_text = original_price_text
+        self.discount_percent = discount_percent
+        self.discount_source = discount_source
+        self.url = url
+        self.image = image
+        self.thumbnail = thumbnail
+
+    @classmethod
+    def from_row(cls, row, thumbnail_fn=None):
+        site, title, price, orig, source, url, image, dp, pid = _raw_fields(_as_dict(row))
+        return cls(site, title, price, orig, parse_discount(dp), source, url, image,
+                   thumbnail_fn(image) if thumbnail_fn else None, pid)
+
+    @property
+    def price_value(self):
+        return parse_price_to_number(self.price_text)
+
+    @property
+    def original_price_value(self):
+        return parse_price_to_number(self.original_price_text)
+
+    def to_dict(self):
+        return {
+            "id": self.id,
+            "site": self.site,
+            "title": self.title,
+            "price_text": self.price_text,
+            "original_price_text": self.original_price_text,
+            "discount_percent": self.discount_percent,
+            "discount_source": self.discount_source,
+            "url": self.url,
+            "image": self.image,
+            "thumbnail": self.thumbnail,
+        }
+
+    def __repr__(self):
+        return f"ProductRecord(site={self.site!r}, title={self.title!r}, price_text={self.price_text!r})"
+
+
+# ------------------------------------------------------------------
+# Column batch
+# ------------------------------------------------------------------
+def _parse_column(values, parse):
+    """Parse a column, running `parse` once per distinct value. Missing -> NaN."""
+    seen = {}
+    out = array("d")
+    append = out.append
+    for v in values:
+        try:
+            append(seen[v])
+        except KeyError:
+            r = parse(v) if v not in (None, "") else None
+            r = NAN if r is None else r
+            seen[v] = r
+            append(r)
+        except TypeError:  # unhashable oddity: parse without caching
+            r = parse(v)
+            append(NAN if r is None else r)
+    return out
+
+
+class ProductBatch:
+    """Column-oriented product records; row i is spread across every column at index i."""
+
+    __slots__ = TEXT_FIELDS + ("discount_percent", "price_value", "original_price_value")
+
+    def __init__(self):
+        for name in TEXT_FIELDS:
+            setattr(self, name, [])
+        self.discount_percent = array("d")
+        self.price_value = array("d")
+        self.original_price_value = array("d")
+
+    def __len__(self):
+        return len(self.site)
+
+    @classmethod
+    def from_rows(cls, rows, thumbnail_fn=None):
+        batch = cls()
+        # transpose row tuples into columns in one C-level pass
+        columns = list(zip(*[_raw_fields(_as_dict(r)) for r in rows])) or [()] * 9
+        (batch.site, batch.title, batch.price_text, batch.original_price_text,
+         batch.discount_source, batch.url, batch.image) = (list(c) for c in columns[:7])
+        discounts = columns[7]
+        batch.id = list(columns[8])
+
+        if thumbnail_fn:
+            # one call per distinct image URL; catalogues repeat the same images a lot
+            thumbs = {}
+            batch.thumbnail = [
+                thumbs[i] if i in thumbs else thumbs.setdefault(i, thumbnail_fn(i)) for i in batch.image
+            ]
+        else:
+            batch.thumbnail = [None] * len(batch.image)
+        batch.discount_percent = _parse_column(discounts, parse_discount)
+        batch.price_value = _parse_column(batch.price_text, parse_price_to_number)
+        batch.original_price_value = _parse_column(batch.original_price_text, parse_price_to_number)
+        return batch
+
+    def record(self, i):
+        dp = self.discount_percent[i]
+        return ProductRecord(
+            id=self.id[i],
+            site=self.site[i],
+            title=self.title[i],
+            price_text=self.price_text[i],
+            original_price_text=self.original_price_text[i],
+            discount_percent=None if math.isnan(dp) else dp,
+            discount_source=self.discount_source[i],
+            url=self.url[i],
+            image=self.image[i],
+            thumbnail=self.thumbnail[i],
+        )
+
+    def __iter__(self):
+        for i in range(len(self)):
+            yield self.record(i)
+
+    def to_dicts(self):
+        return [r.to_dict() for r in self]
+
+    def to_numpy(self):
+        """Numeric columns as float64 NumPy arrays (zero-copy over the array buffers)."""
+        # imported here so the app, which imports this module, never pays for NumPy
+        try:
+            import numpy as np
+        except ImportError:
+            raise RuntimeError("NumPy is not installed") from None
+        return {
+            "discount_percent": np.frombuffer(self.discount_percent, dtype=np.float64),
+            "price_value": np.frombuffer(self.price_value, dtype=np.float64),
+            "original_price_value": np.frombuffer(self.original_price_value, dtype=np.float64),
+        }
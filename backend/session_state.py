@@ -0,0 +1,204 @@
+# session_state.py
+import json
+import logging
+import os
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+
+# --------------------
+# Config
+# --------------------
+STATE_DIR = os.environ.get(
+    "SESSION_STATE_DIR", os.path.join(os.path.dirname(__file__), "session_state")
+)
+# Re-save a state this old after a successful scrape so cookies keep rolling.
+REFRESH_AFTER_SECONDS = int(os.environ.get("SESSION_REFRESH_AFTER", 6 * 3600))
+# Never reuse a state older than this; fall back to a cold context instead.
+MAX_AGE_SECONDS = int(os.environ.get("SESSION_MAX_AGE", 3 * 24 * 3600))
+
+# Where each site lands for a warm-up visit, and which modals it throws at new visitors.
+SITE_HOMEPAGES = {
+    "amazon": "https://www.amazon.in/",
+    "flipkart": "https://www.flipkart.com/",
+    "nykaa": "https://www.nykaa.com/",
+}
+SITE_POPUPS = {
+    "amazon": ["input[data-action-type='DISMISS']", "#nav-main .glow-toaster-button-dismiss"],
+    "flipkart": ["button:has-text('✕')", "span[role='button']:has-text('✕')"],
+    "nykaa": ["button[aria-label='close']", "div[role='dialog'] button:has-text('×')"],
+}
+
+
+class SessionStore:
+    """
+    Per-site Playwright storage state (cookies + localStorage) on disk.
+
+    Each site gets `<site>.json` (what `browser.new_context(storage_state=...)`
+    consumes) and `<site>.meta.json` with save time and the popups that were
+    dismissed while producing it – the ones scrapers then check for (see
+    `known_popups`). Page-ready timings are kept in memory so the
+    time saved by warm contexts can be compared against cold ones.
+    """
+
+    def __init__(self, root=STATE_DIR, refresh_after=REFRESH_AFTER_SECONDS, max_age=MAX_AGE_SECONDS):
+        self.root = root
+        self.refresh_after = refresh_after
+        self.max_age = max_age
+        self._lock = threading.Lock()
+        self._timings = {}
+        os.makedirs(root, exist_ok=True)
+
+    def _state_file(self, site):
+        return os.path.join(self.root, f"{site}.json")
+
+    def _meta_file(self, site):
+        return os.path.join(self.root, f"{site}.meta.json")
+
+    def meta(self, site):
+        try:
+            with open(self._meta_file(site), "r", encoding="utf-8") as f:
+                return json.load(f)
+        except Exception:
+            return {}
+
+    def age(self, site):
+        saved_at = self.meta(site).get("saved_at")
+        if saved_at is None or not os.path.exists(self._state_file(site)):
+            return None
+        return time.time() - saved_at
+
+    def state_path(self, site):
+        """Path to pass as `storage_state`, or None if there is no usable state."""
+        age = self.age(site)
+        if age is None:
+            return None
+        if age > self.max_age:
+            logger.info("Session state for %s expired (%.0f h old)", site, age / 3600)
+            self.invalidate(site, reason="expired")
+            return None
+        return self._state_file(site)
+
+    def dismissed_popups(self, site):
+        return self.meta(site).get("dismissed_popups", [])
+
+    def known_popups(self, site):
+        """
+        Modal selectors a scraper should look for on `site`: the ones actually
+        dismissed while producing its saved states, else the first default.
+        On a warm context any of them showing up means the state stopped
+        suppressing it.
+        """
+        return self.dismissed_popups(site) or SITE_POPUPS.get(site, [])[:1]
+
+    def needs_refresh(self, site):
+        age = self.age(site)
+        return age is None or age > self.refresh_after
+
+    async def save(self, site, context, dismissed_popups=None):
+        state = await context.storage_state()
+        meta = self.meta(site)
+        popups = set(meta.get("dismissed_popups", []))
+        popups.update(dismissed_popups or [])
+        meta.update({
+            "saved_at": time.time(),
+            "cookies": len(state.get("cookies", [])),
+            "origins": len(state.get("origins", [])),
+            "dismissed_popups": sorted(popups),
+        })
+        with self._lock:
+            for path, data in ((self._state_file(site), state), (self._meta_file(site), meta)):
+                tmp = path + ".tmp"
+                with open(tmp, "w", encoding="utf-8") as f:
+                    json.dump(data, f)
+                os.replace(tmp, path)
+        logger.info("Saved session state for %s (%d cookies)", site, meta["cookies"])
+
+    async def refresh_if_stale(self, site, context, dismissed_popups=None):
+        if dismissed_popups or self.needs_refresh(site):
+            try:
+                await self.save(site, context, dismissed_popups)
+            except Exception as e:
+                logger.warning("Could not refresh session state for %s: %s", site, e)
+
+    def invalidate(self, site, reason=""):
+        with self._lock:
+            for path in (self._state_file(site), self._meta_file(site)):
+                try:
+                    os.remove(path)
+                except OSError:
+                    pass
+        logger.info("Invalidated session state for %s %s", site, f"({reason})" if reason else "")
+
+    # ---- page-ready timing ----
+    def record_page_ready(self, site, seconds, warm):
+        with self._lock:
+            t = self._timings.setdefault(site, {"warm": [0, 0.0], "cold": [0, 0.0]})
+            bucket = t["warm" if warm else "cold"]
+            bucket[0] += 1
+            bucket[1] += seconds
+
+    def stats(self):
+        out = {}
+        with self._lock:
+            timings = {k: {b: list(v) for b, v in t.items()} for k, t in self._timings.items()}
+        for site in SITE_HOMEPAGES:
+            t = timings.get(site, {"warm": [0, 0.0], "cold": [0, 0.0]})
+            warm_avg = t["warm"][1] / t["warm"][0] if t["warm"][0] else None
+            cold_avg = t["cold"][1] / t["cold"][0] if t["cold"][0] else None
+            age = self.age(site)
+            out[site] = {
+                "has_state": age is not None,
+                "age_seconds": round(age, 1) if age is not None else None,
+                "dismissed_popups": self.dismissed_popups(site),
+                "warm_pages": t["warm"][0],
+                "cold_pages": t["cold"][0],
+                "avg_ready_warm_s": round(warm_avg, 3) if warm_avg is not None else None,
+                "avg_ready_cold_s": round(cold_avg, 3) if cold_avg is not None else None,
+                "saved_per_page_s": round(cold_avg - warm_avg, 3)
+                if warm_avg is not None and cold_avg is not None else None,
+            }
+        return out
+
+
+async def warm_up(site, headless=False, store=None):
+    """
+    Visit a site's homepage in a fresh context, dismiss its first-visit
+    modals, let it set its cookies and save the resulting storage state.
+    """
+    from playwright.async_api import async_playwright
+    from navigation import navigate
+    from scrapers import _close_possible_popup_selectors
+
+    store = store or session_store
+    async with async_playwright() as p:
+        browser = await p.chromium.launch(headless=headless)
+        context = await browser.new_context(locale="en-IN")
+        page = await context.new_page()
+        try:
+            await navigate(page, site, SITE_HOMEPAGES[site], wait_until="domcontentloaded")
+            try:
+                await page.wait_for_load_state("networkidle", timeout=15000)
+            except Exception:
+                pass
+            dismissed = await _close_possible_popup_selectors(page, SITE_POPUPS.get(site, []), timeout=4000)
+            await store.save(site, context, dismissed)
+        finally:
+            await page.close()
+            await context.close()
+            await browser.close()
+    return store.meta(site)
+
+
+session_store = SessionStore()
+
+
+if __name__ == "__main__":
+    import asyncio
+    import sys
+
+    logging.basicConfig(level=logging.INFO)
+    for site_name in sys.argv[1:] or list(SITE_HOMEPAGES):
+        print(site_name, asyncio.run(warm_up(site_name, headless=True)))
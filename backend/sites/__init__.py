@@ -0,0 +1,83 @@
+# sites/__init__.py
+"""
+Site registry.
+
+Each site lives in `sites/<name>.py` and declares:
+    NAME      – registry key, also used as the `site` field on results
+    DEFAULTS  – default keyword arguments for its entry point
+    scrape    – async entry point: scrape(keyword=..., max_products=..., ...)
+
+and, for offline re-extraction over archived pages (see html_archive.py):
+    extract_cards_html(html) – the page's cards as plain dicts, like the live extractor
+    parse_card(card)         – one card -> result row, or None
+
+Modules are imported on first use, and Playwright only once a scrape runs, so
+importing the registry – or the Flask app, or the offline re-extractor – stays
+cheap.
+"""
+import importlib
+import logging
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+# name -> module path. Add a site by dropping in a module and listing it here.
+SITE_MODULES = {
+    "amazon": "sites.amazon",
+    "flipkart": "sites.flipkart",
+    "nykaa": "sites.nykaa",
+}
+
+_loaded = {}
+_load_times = {}
+_lock = threading.Lock()
+
+
+def available_sites():
+    return list(SITE_MODULES)
+
+
+def load_site(name):
+    """Import and return the site module for `name`. Raises KeyError for unknown sites."""
+    mod = _loaded.get(name)
+    if mod is not None:
+        return mod
+    path = SITE_MODULES[name]
+    with _lock:
+        if name not in _loaded:
+            t0 = time.perf_counter()
+            mod = importlib.import_module(path)
+            for attr in ("NAME", "DEFAULTS", "scrape"):
+                if not hasattr(mod, attr):
+                    raise ImportError(f"site module {path} does not define {attr}")
+            _load_times[name] = time.perf_counter() - t0
+            _loaded[name] = mod
+            logger.info("Loaded site %s in %.0f ms", name, _load_times[name] * 1000)
+    return _loaded[name]
+
+
+def register_site(module):
+    """
+    Register an already-built site object (anything with NAME, DEFAULTS and
+    scrape), replacing any module of the same name – e.g. stub sites for load tests.
+    """
+    with _lock:
+        SITE_MODULES[module.NAME] = getattr(module, "__name__", module.NAME)
+        _loaded[module.NAME] = module
+        _load_times[module.NAME] = 0.0
+
+
+def loaded_sites():
+    return {name: round(_load_times[name], 4) for name in _loaded}
+
+
+async def run_site(name, **kwargs):
+    """
+    Load `name` if needed and run its scraper with DEFAULTS overridden by `kwargs`.
+    Pass `stats={}` to collect per-run counters (e.g. duplicates_skipped).
+    """
+    mod = load_site(name)
+    params = dict(mod.DEFAULTS)
+    params.update({k: v for k, v in kwargs.items() if v is not None})
+    return await mod.scrape(**params)
@@ -0,0 +1,272 @@
+# sites/amazon.py
+import asyncio
+import logging
+import re
+import time
+
+from html_archive import archive_page
+from memory import MemoryMonitor, MemoryCeilingExceeded, PageRecycler
+from navigation import navigate, breaker_for, BlockedError, NavigationError
+from scrapers import make_absolute_url, normalize_display_price, get_user_agent, parse_html, select_text
+from session_state import session_store
+
+logger = logging.getLogger(__name__)
+
+NAME = "amazon"
+DEFAULTS = {"max_products": 10, "max_pages": 2}
+BASE = "https://www.amazon.in"
+
+
+# Card fields are read in the page and returned as plain data, so no
+# ElementHandle outlives the call. Cards whose ASIN was already seen (sponsored
+# repeats across pages) are skipped before any other DOM work.
+# The same selectors drive extract_cards_html(), the offline extractor over
+# archived pages, so a selector fix can be checked without re-crawling.
+_CARD_SELECTOR = "div.s-result-item[data-component-type='s-search-result']"
+_SELECTORS = {
+    "link": "h2 a",
+    "img": "img.s-image",
+    "title": "h2 a span",
+    "price": "span.a-price > span.a-offscreen",
+    "orig": "span.a-text-price span.a-offscreen",
+    "disc": "span.savingsPercentage",
+}
+_TEXT_FIELDS = ("title", "price", "orig", "disc")
+_IMG_ATTRS = ("src", "data-image-src", "srcset", "data-src")
+_SCROLL_CARDS_JS = """
+async (cards, {limit, seen}) => {
+    const known = new Set(seen);
+    const fresh = cards.filter(c => !known.has(c.getAttribute("data-asin")));
+    for (const c of fresh.slice(0, limit)) {
+        c.scrollIntoView({block: "center"});
+        await new Promise(r => setTimeout(r, 200));
+    }
+}
+"""
+_EXTRACT_CARDS_JS = """
+(cards, {seen, sel, textFields, imgAttrs}) => {
+  const known = new Set(seen);
+  let skipped = 0;
+  const out = [];
+  for (const c of cards) {
+    const id = c.getAttribute("data-asin") || null;
+    if (id) {
+        if (known.has(id)) { skipped++; continue; }
+        known.add(id);
+    }
+    const link = c.querySelector(sel.link);
+    const img = c.querySelector(sel.img);
+    const card = {id: id, href: link ? link.getAttribute("href") : null, img: {}};
+    if (img) {
+        for (const a of imgAttrs) card.img[a] = img.getAttribute(a);
+    }
+    for (const f of textFields) {
+        const e = c.querySelector(sel[f]);
+        card[f] = e ? e.innerText.trim() : null;
+    }
+    out.push(card);
+  }
+  return {cards: out, skipped: skipped};
+}
+"""
+_PLACEHOLDER_MARKERS = ("placeholder", "transparent", "pixel", "no-image", "sprite", "ux-sprite")
+
+
+def _extract_args(seen):
+    return {"seen": list(seen), "sel": _SELECTORS, "textFields": _TEXT_FIELDS, "imgAttrs": _IMG_ATTRS}
+
+
+def extract_cards_html(html, seen=()):
+    """Offline twin of _EXTRACT_CARDS_JS over a saved page's HTML."""
+    known = set(seen)
+    skipped = 0
+    out = []
+    for c in parse_html(html).select(_CARD_SELECTOR):
+        card_id = c.get("data-asin") or None
+        if card_id:
+            if card_id in known:
+                skipped += 1
+                continue
+            known.add(card_id)
+        link = c.select_one(_SELECTORS["link"])
+        img = c.select_one(_SELECTORS["img"])
+        card = {
+            "id": card_id,
+            "href": link.get("href") if link is not None else None,
+            "img": {a: img.get(a) for a in _IMG_ATTRS} if img is not None else {},
+        }
+        for f in _TEXT_FIELDS:
+            card[f] = select_text(c, _SELECTORS[f])
+        out.append(card)
+    return {"cards": out, "skipped": skipped}
+
+
+def parse_card(card, base=BASE):
+    """Turn one extracted card into a result row; None if it is not a usable product."""
+    # ----- TITLE -----
+    title = card["title"]
+    if not title:
+        return None
+
+    # ----- URL -----
+    url_link = make_absolute_url(base, card["href"])
+
+    # ----- IMAGE -----
+    image_url = None
+    for attr in _IMG_ATTRS:
+        v = card["img"].get(attr)
+        if not v:
+            continue
+        if "srcset" in attr:
+            v = v.split(",")[0].strip().split(" ")[0]
+        image_url = v
+        break
+
+    # Convert to absolute
+    if image_url:
+        image_url = make_absolute_url(base, image_url)
+
+    # ---- AMAZON PLACEHOLDER DETECTION ----
+    if image_url:
+        low = image_url.lower()
+        if any(marker in low for marker in _PLACEHOLDER_MARKERS):
+            image_url = None
+
+    # ----- PRICE -----
+    price_raw = card["price"]
+    orig_raw = card["orig"]
+
+    # Discount
+    discount = None
+    if card["disc"]:
+        m = re.search(r"(\d+)", card["disc"])
+        if m:
+            discount = float(m.group(1))
+
+    # Normalize
+    out_price = normalize_display_price(price_raw)
+    out_orig = normalize_display_price(orig_raw)
+
+    if out_price == "N/A" and out_orig != "N/A":
+        out_price = out_orig
+    if out_orig == "N/A" and out_price != "N/A":
+        out_orig = out_price
+
+    discount = discount or 0.0
+
+    return {
+        "site": "amazon",
+        "ID": card["id"],
+        "Title": title,
+        "Price": out_price,
+        "OriginalPrice": out_orig,
+        "DiscountPercent": discount,
+        "DiscountSource": "scraped" if discount else "none",
+        "URL": url_link,
+        "image": image_url,  # if None → frontend shows dummy
+    }
+
+
+# ------------------------------------------------------------------
+# AMAZON – fixed image handling (scroll + placeholder filtering)
+# ------------------------------------------------------------------
+async def scrape_amazon(keyword="laptop", max_products=10, max_pages=2, headless=False, stats=None):
+    # imported here so the offline extractors above work without Playwright installed
+    from playwright.async_api import async_playwright
+
+    breaker_for("amazon").reject_if_open()  # fail fast before launching a browser
+    results = []
+    seen = set()
+    duplicates = 0
+    base = BASE
+    monitor = MemoryMonitor("amazon")
+
+    try:
+        async with async_playwright() as p:
+            browser = await p.chromium.launch(headless=headless)
+            pages = PageRecycler(
+                browser,
+                monitor,
+                context_kwargs=dict(
+                    user_agent=get_user_agent(),
+                    viewport={"width": 1280, "height": 900},
+                    java_script_enabled=True,
+                    locale="en-IN",
+                ),
+                storage_state=lambda: session_store.state_path("amazon"),
+                on_recycle=lambda ctx: session_store.refresh_if_stale("amazon", ctx),
+            )
+
+            page_num = 1
+
+            try:
+                while len(results) < max_products and page_num <= max_pages:
+                    url = f"{base}/s?k={keyword.replace(' ', '+')}&page={page_num}"
+                    logger.info("Amazon (search) -> %s", url)
+
+                    t0 = time.perf_counter()
+                    try:
+                        page = await pages.before_page()
+                        await navigate(page, "amazon", url)
+                    except (NavigationError, MemoryCeilingExceeded) as e:
+                        if isinstance(e, BlockedError) and pages.warm:
+                            session_store.invalidate("amazon", reason="block page on a warm session")
+                        if not results:
+                            raise
+                        logger.warning("Amazon: stopping at page %d, keeping %d items: %s", page_num, len(results), e)
+                        break
+                    await page.wait_for_load_state("networkidle")
+                    session_store.record_page_ready("amazon", time.perf_counter() - t0, pages.warm)
+
+                    # ---- FORCE FULL PAGE SCROLL TO LOAD LAZY IMAGES ----
+                    for _ in range(20):
+                        await page.mouse.wheel(0, 2000)
+                        await asyncio.sleep(0.4)
+
+                    # Scroll each remaining card into view, then read every card in one call
+                    try:
+                        await page.eval_on_selector_all(
+                            _CARD_SELECTOR, _SCROLL_CARDS_JS,
+                            {"limit": max_products - len(results), "seen": list(seen)},
+                        )
+                    except Exception:
+                        pass
+                    await archive_page(page, "amazon", keyword, page_num, url)
+                    extracted = await page.eval_on_selector_all(_CARD_SELECTOR, _EXTRACT_CARDS_JS, _extract_args(seen))
+                    await pages.page_done()
+                    cards = extracted["cards"]
+                    duplicates += extracted["skipped"]
+                    if not cards and not extracted["skipped"]:
+                        break
+
+                    for card in cards:
+                        if len(results) >= max_products:
+                            break
+                        if card["id"]:
+                            seen.add(card["id"])
+                        try:
+                            row = parse_card(card, base)
+                        except Exception as e:
+                            logger.debug("Amazon item error: %s", e)
+                            continue
+                        if row:
+                            results.append(row)
+
+                    page_num += 1
+
+                await session_store.refresh_if_stale("amazon", pages.context)
+
+            finally:
+                await pages.close()
+                await browser.close()
+    finally:
+        # also runs when the launch itself fails, so tracemalloc is never left on
+        monitor.finish(items=len(results))
+
+    if stats is not None:
+        stats["duplicates_skipped"] = duplicates
+    logger.info("Amazon scraped %d items (%d duplicates skipped)", len(results), duplicates)
+    return results
+
+
+scrape = scrape_amazon
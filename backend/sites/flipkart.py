@@ -0,0 +1,260 @@
+# sites/flipkart.py
+import asyncio
+import logging
+import re
+import time
+from urllib.parse import urljoin, unquote
+
+from html_archive import archive_page
+from memory import MemoryMonitor, MemoryCeilingExceeded, PageRecycler
+from navigation import navigate, breaker_for, BlockedError, NavigationError
+from scrapers import (
+    make_absolute_url,
+    parse_price_to_number,
+    normalize_display_price,
+    _close_possible_popup_selectors,
+    _wait_for_grid,
+    parse_html,
+)
+from session_state import session_store
+
+logger = logging.getLogger(__name__)
+
+NAME = "flipkart"
+DEFAULTS = {"max_products": 24, "max_pages": 5}
+BASE = "https://www.flipkart.com"
+
+# `data-id` is read first: ids already seen (earlier pages, or nested/duplicate
+# containers on this one) are skipped before touching the card's markup.
+# Containers without a price are layout wrappers, not products; they are
+# dropped in the page so their markup is never copied into Python.
+# extract_cards_html() does the same over archived pages.
+_CARD_SELECTOR = "div[data-id]"
+_EXTRACT_CARDS_JS = """
+(cards, seen) => {
+    const known = new Set(seen);
+    let skipped = 0;
+    const out = [];
+    for (const c of cards) {
+        const id = c.getAttribute("data-id");
+        if (known.has(id)) { skipped++; continue; }
+        known.add(id);
+        const html = c.innerHTML;
+        if (!html.includes("₹")) continue;
+        const img = c.querySelector("img");
+        const link = c.querySelector("a");
+        out.push({
+            id: id,
+            html: html,
+            src: img ? img.getAttribute("src") : null,
+            data_src: img ? img.getAttribute("data-src") : null,
+            href: link ? link.getAttribute("href") : null,
+        });
+    }
+    return {total: cards.length, skipped: skipped, cards: out};
+}
+"""
+
+
+_NOT_TITLE_RE = re.compile(r'₹|%|★|off|Add to Cart', re.I)
+
+
+def extract_cards_html(html, seen=()):
+    """Offline twin of _EXTRACT_CARDS_JS over a saved page's HTML."""
+    known = set(seen)
+    skipped = 0
+    out = []
+    cards = parse_html(html).select(_CARD_SELECTOR)
+    for c in cards:
+        card_id = c.get("data-id")
+        if card_id in known:
+            skipped += 1
+            continue
+        known.add(card_id)
+        inner = c.decode_contents()
+        if "₹" not in inner:
+            continue
+        img = c.find("img")
+        link = c.find("a")
+        out.append({
+            "id": card_id,
+            "html": inner,
+            "src": img.get("src") if img is not None else None,
+            "data_src": img.get("data-src") if img is not None else None,
+            "href": link.get("href") if link is not None else None,
+        })
+    return {"total": len(cards), "skipped": skipped, "cards": out}
+
+
+def parse_card(card, base=BASE):
+    """Turn one extracted card into a result row; None if it has no title or price."""
+    html = card["html"]
+
+    # ----- IMAGE -----
+    image_url = card["src"]
+    if (not image_url) or image_url.startswith("data:"):
+        image_url = card["data_src"]
+    if image_url:
+        image_url = make_absolute_url(base, image_url)
+
+    # TITLE
+    m = re.findall(r'>([^<>]{10,120})<', html)
+    title = None
+    if m:
+        candidates = [t.strip() for t in m if not _NOT_TITLE_RE.search(t)]
+        title = max(candidates, key=len) if candidates else None
+
+    # PRICE
+    price_match = re.search(r'₹\s?[\d,]+', html)
+    price_raw = price_match.group(0) if price_match else None
+
+    # DISCOUNT
+    disc_match = re.search(r'(\d{1,2})%\s*off', html, re.I)
+    discount = int(disc_match.group(1)) if disc_match else None
+
+    # ORIGINAL
+    orig_raw = None
+    pnum = parse_price_to_number(price_raw)
+    if pnum and discount:
+        try:
+            orig_val = round(pnum * 100 / (100 - discount))
+            orig_raw = f"{orig_val:,}"
+        except:
+            pass
+
+    # URL
+    href = card["href"]
+
+    url_link = None
+    if href:
+        href = unquote(href)
+        if href.startswith("/"):
+            href = href.split("?")[0]
+            url_link = urljoin(base, href)
+        elif href.startswith("http"):
+            url_link = href
+
+    if not title or not price_raw:
+        return None
+
+    return {
+        "site": "flipkart",
+        "ID": card["id"],
+        "Title": title,
+        "Price": normalize_display_price(price_raw),
+        "OriginalPrice": normalize_display_price(orig_raw),
+        "DiscountPercent": float(discount) if discount else 0.0,
+        "DiscountSource": "scraped_badge" if discount else "none",
+        "URL": url_link,
+        "image": image_url,
+    }
+
+
+# ------------------------------------------------------------------
+# FLIPKART – same as your working version
+# ------------------------------------------------------------------
+async def scrape_flipkart(keyword="laptop", max_products=24, max_pages=5, headless=False, stats=None):
+    """
+    Flipkart scraper using the SAME environment as your working script:
+      - NO fake UA
+      - NO custom viewport
+      - NO custom headers
+      - Uses div[data-id] selectors
+      - Scroll + regex extraction
+    """
+    # imported here so the offline extractors above work without Playwright installed
+    from playwright.async_api import async_playwright
+
+    breaker_for("flipkart").reject_if_open()
+    results = []
+    seen = set()
+    duplicates = 0
+    base = BASE
+
+    dismissed = []
+    monitor = MemoryMonitor("flipkart")
+
+    try:
+        async with async_playwright() as p:
+            browser = await p.chromium.launch(headless=headless)
+            pages = PageRecycler(
+                browser,
+                monitor,
+                storage_state=lambda: session_store.state_path("flipkart"),
+                on_recycle=lambda ctx: session_store.refresh_if_stale("flipkart", ctx, dismissed),
+            )
+
+            page_number = 1
+
+            try:
+                while len(results) < max_products and page_number <= max_pages:
+
+                    url = f"{base}/search?q={keyword}&page={page_number}"
+                    logger.info("Flipkart (search) -> %s", url)
+                    t0 = time.perf_counter()
+                    try:
+                        page = await pages.before_page()
+                        await navigate(page, "flipkart", url)
+                    except (NavigationError, MemoryCeilingExceeded) as e:
+                        if isinstance(e, BlockedError) and pages.warm:
+                            session_store.invalidate("flipkart", reason="block page on a warm session")
+                        if not results:
+                            raise
+                        logger.warning("Flipkart: stopping at page %d, keeping %d items: %s",
+                                       page_number, len(results), e)
+                        break
+
+                    # Close popup – a saved session has already dismissed it, so only glance for it
+                    closed = await _close_possible_popup_selectors(
+                        page, session_store.known_popups("flipkart"), timeout=500 if pages.warm else 4000
+                    )
+                    if closed:
+                        logger.info("Closed login popup")
+                        if pages.warm:
+                            # the saved state no longer suppresses the modal
+                            session_store.invalidate("flipkart", reason="login popup reappeared")
+                            pages.warm = False
+                        dismissed.extend(closed)
+                    await _wait_for_grid(page, _CARD_SELECTOR, timeout=10000)
+                    session_store.record_page_ready("flipkart", time.perf_counter() - t0, pages.warm)
+
+                    # Scroll like your script
+                    for _ in range(12):
+                        await page.mouse.wheel(0, 2000)
+                        await asyncio.sleep(0.7)
+
+                    await archive_page(page, "flipkart", keyword, page_number, url)
+                    extracted = await page.eval_on_selector_all(_CARD_SELECTOR, _EXTRACT_CARDS_JS, list(seen))
+                    await pages.page_done()
+                    product_cards = extracted["cards"]
+                    duplicates += extracted["skipped"]
+                    logger.info("Flipkart: found %d product containers (%d new and priced, %d duplicates) on page %d",
+                                extracted["total"], len(product_cards), extracted["skipped"], page_number)
+
+                    for card in product_cards:
+                        if len(results) >= max_products:
+                            break
+                        seen.add(card["id"])
+                        row = parse_card(card, base)
+                        if row:
+                            results.append(row)
+
+                    logger.info("Flipkart: extracted %d items so far", len(results))
+                    page_number += 1
+
+                await session_store.refresh_if_stale("flipkart", pages.context, dismissed)
+
+            finally:
+                await pages.close()
+                await browser.close()
+    finally:
+        # also runs when the launch itself fails, so tracemalloc is never left on
+        monitor.finish(items=len(results))
+
+    if stats is not None:
+        stats["duplicates_skipped"] = duplicates
+    logger.info("Flipkart scraped %d items (final, %d duplicates skipped)", len(results), duplicates)
+    return results
+
+
+scrape = scrape_flipkart
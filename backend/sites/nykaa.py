@@ -0,0 +1,324 @@
+# sites/nykaa.py
+import asyncio
+import logging
+import re
+import time
+from urllib.parse import urljoin
+
+from html_archive import archive_page
+from memory import MemoryMonitor, MemoryCeilingExceeded, PageRecycler
+from navigation import navigate, breaker_for, BlockedError, NavigationError
+from scrapers import (
+    make_absolute_url,
+    parse_price_to_number,
+    normalize_display_price,
+    _close_possible_popup_selectors,
+    _wait_for_grid,
+    parse_html,
+    select_text,
+)
+from session_state import session_store
+
+logger = logging.getLogger(__name__)
+
+NAME = "nykaa"
+DEFAULTS = {"max_products": 20, "max_pages": 3}
+BASE = "https://www.nykaa.com"
+
+# Card fields are read in the page and returned as plain data, so no
+# ElementHandle outlives the call. The product id comes from the card's link
+# (/p/<id> or ?productId=<id>); already-seen ids are skipped before the rest.
+# Nykaa's class names are build hashes and change without notice. They live
+# only here: the live JS and the offline extract_cards_html() both read them,
+# so a fix can be checked against archived pages before re-crawling.
+_CARD_SELECTOR = "div.css-1rd7vky"
+_SELECTORS = {
+    "title": "div.css-xrzmfa",
+    "price": "span.css-111z9ua",
+    "orig": "span.css-17x46n5",
+    "disc": "span.css-cjd9an",
+}
+_IMG_ATTRS = ("src", "data-src", "data-srcset", "srcset")
+_PRODUCT_ID_RES = (re.compile(r"[?&]productId=(\d+)"), re.compile(r"/p/(\d+)"))
+_EXTRACT_CARDS_JS = """
+(cards, {seen, sel, imgAttrs}) => {
+  const known = new Set(seen);
+  let skipped = 0;
+  const out = [];
+  for (const c of cards) {
+    const link = c.querySelector("a[href]") || c.closest("a");
+    const href = link ? link.getAttribute("href") : null;
+    const m = href ? (href.match(/[?&]productId=(\\d+)/) || href.match(/\\/p\\/(\\d+)/)) : null;
+    const id = m ? m[1] : null;
+    if (id) {
+        if (known.has(id)) { skipped++; continue; }
+        known.add(id);
+    }
+    const img = c.querySelector("img");
+    const card = {id: id, href: href, img: {}};
+    if (img) {
+        for (const a of imgAttrs) card.img[a] = img.getAttribute(a);
+    }
+    for (const [f, s] of Object.entries(sel)) {
+        const e = c.querySelector(s);
+        card[f] = e ? e.innerText : null;
+    }
+    out.push(card);
+  }
+  return {cards: out, skipped: skipped};
+}
+"""
+# Product pages are a best-effort image fallback: short timeout, and their own
+# breaker/latency key so failures here never block the search pages.
+_DETAIL_KEY = "nykaa:detail"
+_DETAIL_TIMEOUT_MS = 10000
+_OG_IMAGE_JS = """
+() => {
+    const m = document.querySelector('meta[property="og:image"]');
+    return m ? m.getAttribute("content") : null;
+}
+"""
+
+
+def _extract_args(seen):
+    return {"seen": list(seen), "sel": _SELECTORS, "imgAttrs": _IMG_ATTRS}
+
+
+def _product_id(href):
+    for pattern in _PRODUCT_ID_RES:
+        m = pattern.search(href)
+        if m:
+            return m.group(1)
+    return None
+
+
+def extract_cards_html(html, seen=()):
+    """Offline twin of _EXTRACT_CARDS_JS over a saved page's HTML."""
+    known = set(seen)
+    skipped = 0
+    out = []
+    for c in parse_html(html).select(_CARD_SELECTOR):
+        link = c.select_one("a[href]") or c.find_parent("a")
+        href = link.get("href") if link is not None else None
+        card_id = _product_id(href) if href else None
+        if card_id:
+            if card_id in known:
+                skipped += 1
+                continue
+            known.add(card_id)
+        img = c.find("img")
+        card = {
+            "id": card_id,
+            "href": href,
+            "img": {a: img.get(a) for a in _IMG_ATTRS} if img is not None else {},
+        }
+        for f, sel in _SELECTORS.items():
+            card[f] = select_text(c, sel)
+        out.append(card)
+    return {"cards": out, "skipped": skipped}
+
+
+def parse_card(card, base=BASE):
+    """
+    Turn one extracted card into a result row; None if it has no title or price.
+    `image` may be None – the live scraper then falls back to the product page.
+    """
+    # --- Product Link ---
+    href = card["href"]
+    url_link = urljoin(base, href.strip()) if href else None
+
+    # --- IMAGE from listing ---
+    img_url = None
+    for attr in _IMG_ATTRS:
+        val = card["img"].get(attr)
+        if not val:
+            continue
+        if "srcset" in attr:
+            first = val.split(",")[0].strip().split(" ")[0]
+            val = first
+        img_url = val
+        if img_url:
+            break
+
+    if img_url:
+        img_url = make_absolute_url(base, img_url)
+
+    # --- Title ---
+    title = card["title"]
+
+    # --- Price (selling) ---
+    price_raw = card["price"]
+
+    # --- Original Price (MRP) ---
+    orig_raw = card["orig"]
+
+    # --- Discount ---
+    discount_text = card["disc"]
+    discount = int(re.search(r'(\d+)', discount_text).group(1)) if discount_text else None
+
+    # Skip if no title or no price (invalid card)
+    if not title or not price_raw:
+        return None
+
+    out_title = title.strip()
+    out_price = normalize_display_price(price_raw.strip())
+    if orig_raw:
+        out_orig = normalize_display_price(orig_raw.strip())
+    else:
+        out_orig = "N/A"
+
+    # If we have discount but no original, approximate original
+    if out_orig == "N/A" and discount is not None:
+        pnum = parse_price_to_number(out_price)
+        if pnum is not None and 0 < discount < 95:
+            try:
+                orig_val = round(pnum * 100 / (100 - discount))
+                out_orig = f"{orig_val:,}"
+            except Exception:
+                pass
+
+    discount_percent = float(discount) if discount is not None else 0.0
+    discount_source = "scraped_badge" if discount is not None else "none"
+
+    return {
+        "site": "nykaa",
+        "ID": card["id"],
+        "Title": out_title,
+        "Price": out_price,
+        "OriginalPrice": out_orig,
+        "DiscountPercent": discount_percent,
+        "DiscountSource": discount_source,
+        "URL": url_link,
+        "image": img_url,
+    }
+
+
+# ------------------------------------------------------------------
+# NYKAA – same working version (with image handling)
+# ------------------------------------------------------------------
+async def scrape_nykaa(keyword="lipstick", max_products=20, max_pages=3, headless=False, stats=None):
+    """
+    Nykaa scraper adapted directly from your working notebook version,
+    but returning the unified backend format, now including image.
+
+    Image strategy:
+      1) Try img src / data-src / srcset on the listing card.
+      2) If still missing, open the product URL and read og:image.
+    """
+    # imported here so the offline extractors above work without Playwright installed
+    from playwright.async_api import async_playwright
+
+    breaker_for("nykaa").reject_if_open()
+    results = []
+    seen = set()
+    duplicates = 0
+    base = BASE
+
+    monitor = MemoryMonitor("nykaa")
+
+    try:
+        async with async_playwright() as p:
+            browser = await p.chromium.launch(headless=headless)
+            pages = PageRecycler(   # default UA & viewport
+                browser,
+                monitor,
+                storage_state=lambda: session_store.state_path("nykaa"),
+                on_recycle=lambda ctx: session_store.refresh_if_stale("nykaa", ctx),
+            )
+
+            try:
+                page_num = 1
+                while len(results) < max_products and page_num <= max_pages:
+                    url = f"{base}/search/result/?q={keyword}&page_no={page_num}"
+                    logger.info("Nykaa (search) -> %s", url)
+                    t0 = time.perf_counter()
+                    try:
+                        page = await pages.before_page()
+                        await navigate(page, "nykaa", url)
+                    except (NavigationError, MemoryCeilingExceeded) as e:
+                        if isinstance(e, BlockedError) and pages.warm:
+                            session_store.invalidate("nykaa", reason="block page on a warm session")
+                        if not results:
+                            raise
+                        logger.warning("Nykaa: stopping at page %d, keeping %d items: %s", page_num, len(results), e)
+                        break
+                    # go as soon as the grid renders, warm or cold – later pages of a cold
+                    # context already hold the site's cookies, so a fixed wait only adds time
+                    if not await _wait_for_grid(page, _CARD_SELECTOR, timeout=15000) and pages.warm:
+                        # a missing grid alone proves nothing (no results, or the hashed card
+                        # class changed); only a first-visit modal showing up again does
+                        closed = await _close_possible_popup_selectors(
+                            page, session_store.known_popups("nykaa"), timeout=1000
+                        )
+                        if closed:
+                            session_store.invalidate("nykaa", reason="first-visit modal reappeared")
+                            pages.warm = False
+                    session_store.record_page_ready("nykaa", time.perf_counter() - t0, pages.warm)
+
+                    # Scroll to load all items
+                    for _ in range(10):
+                        await page.mouse.wheel(0, 2000)
+                        await asyncio.sleep(1)
+
+                    await archive_page(page, "nykaa", keyword, page_num, url)
+                    extracted = await page.eval_on_selector_all(_CARD_SELECTOR, _EXTRACT_CARDS_JS, _extract_args(seen))
+                    await pages.page_done()
+                    product_cards = extracted["cards"]
+                    duplicates += extracted["skipped"]
+                    logger.info("Nykaa: found %d new products (%d duplicates) on page %d",
+                                len(product_cards), extracted["skipped"], page_num)
+
+                    for card in product_cards:
+                        if len(results) >= max_products:
+                            break
+                        if card["id"]:
+                            seen.add(card["id"])
+
+                        try:
+                            row = parse_card(card, base)
+                        except Exception as e:
+                            logger.debug("Nykaa parse err: %s", e)
+                            continue
+                        if row is None:
+                            continue
+
+                        # --- Fallback: open product page & read og:image ---
+                        if (not row["image"]) and row["URL"]:
+                            detail_page = None
+                            try:
+                                detail_page = await pages.context.new_page()
+                                await navigate(detail_page, _DETAIL_KEY, row["URL"], max_attempts=1,
+                                               timeout_ms=_DETAIL_TIMEOUT_MS)
+                                ogc = await detail_page.evaluate(_OG_IMAGE_JS)
+                                if ogc:
+                                    row["image"] = make_absolute_url(base, ogc.strip())
+                            except Exception:
+                                pass
+                            finally:
+                                if detail_page is not None:
+                                    try:
+                                        await detail_page.close()
+                                    except Exception:
+                                        pass
+
+                        results.append(row)
+
+                    logger.info("Nykaa: extracted %d items so far...", len(results))
+                    page_num += 1
+
+                await session_store.refresh_if_stale("nykaa", pages.context)
+
+            finally:
+                await pages.close()
+                await browser.close()
+    finally:
+        # also runs when the launch itself fails, so tracemalloc is never left on
+        monitor.finish(items=len(results))
+
+    if stats is not None:
+        stats["duplicates_skipped"] = duplicates
+    logger.info("Nykaa scraped %d items (final, %d duplicates skipped)", len(results), duplicates)
+    return results
+
+
+scrape = scrape_nykaa
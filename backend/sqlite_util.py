@@ -0,0 +1,28 @@
+# sqlite_util.py
+"""Connection and transaction helpers shared by the SQLite-backed stores."""
+import sqlite3
+from contextlib import contextmanager
+
+
+def connect(path):
+    """
+    Autocommit connection in WAL mode, shareable across threads. Callers
+    serialize access with their own lock and group writes with `transaction`.
+    """
+    db = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+    db.execute("PRAGMA journal_mode=WAL")
+    db.execute("PRAGMA synchronous=NORMAL")
+    return db
+
+
+@contextmanager
+def transaction(db, begin="BEGIN"):
+    """BEGIN ... COMMIT, rolled back on any error so the shared connection stays usable."""
+    db.execute(begin)
+    try:
+        yield
+        db.execute("COMMIT")
+    except BaseException:
+        if db.in_transaction:
+            db.execute("ROLLBACK")
+        raise
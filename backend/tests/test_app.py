@@ -0,0 +1,61 @@
+import pytest
+
+import app as app_module
+import delivery
+import sites
+from loadtest import make_stub_site
+
+
+@pytest.fixture
+def client(tmp_path, monkeypatch):
+    for name in sites.available_sites():
+        monkeypatch.setitem(sites._loaded, name, make_stub_site(name, latency_s=0, items=3))
+    monkeypatch.setattr(app_module, "ALERTS_FILE", str(tmp_path / "alerts.json"))
+    monkeypatch.setattr(delivery, "OUTBOX_FILE", str(tmp_path / "outbox.db"))
+    monkeypatch.setattr(delivery, "_outbox", None)
+    return app_module.app.test_client()
+
+
+@pytest.mark.parametrize("value", [5, {"amazon": True}, ["amazon", 3]])
+def test_scrape_rejects_malformed_sites(client, value):
+    resp = client.post("/api/scrape", json={"keyword": "laptop", "sites": value})
+    assert resp.status_code == 400
+
+
+def test_scrape_runs_each_site_once(client):
+    resp = client.post("/api/scrape", json={"keyword": "laptop", "sites": ["amazon", "nykaa", "amazon"]})
+    body = resp.get_json()
+    assert resp.status_code == 200
+    assert body["sites"] == ["amazon", "nykaa"]
+    assert len(body["items"]) == 6
+
+
+def test_breaker_reset_only_for_known_keys(client):
+    import navigation
+
+    resp = client.post("/api/breakers/no-such-site/reset")
+    assert resp.status_code == 404
+    assert "no-such-site" not in navigation.navigation_status()
+
+    assert client.post("/api/breakers/amazon/reset").status_code == 200
+    navigation.breaker_for("nykaa:detail")
+    assert client.post("/api/breakers/nykaa:detail/reset").status_code == 200
+
+
+@pytest.mark.parametrize("value", [5, "amazon,nope", {"nykaa": 1}, ["nykaa", None]])
+def test_warmup_rejects_malformed_sites(client, value):
+    resp = client.post("/api/sessions/warmup", json={"sites": value})
+    assert resp.status_code == 400
+
+
+def test_warmup_accepts_comma_separated_sites(client, monkeypatch):
+    warmed = []
+
+    async def fake_warm_up(site, headless=True):
+        warmed.append(site)
+        return {"site": site}
+
+    monkeypatch.setattr(app_module, "warm_up", fake_warm_up)
+    resp = client.post("/api/sessions/warmup", json={"sites": "nykaa, flipkart,nykaa"})
+    assert resp.status_code == 200
+    assert warmed == ["nykaa", "flipkart"]
@@ -0,0 +1,178 @@
+import asyncio
+import json
+import smtplib
+import sqlite3
+
+import pytest
+
+import app as app_module
+from delivery import (
+    DeliveryWorker,
+    Outbox,
+    PermanentDeliveryError,
+    SMTPSink,
+    build_digest,
+    triggered_entries,
+)
+
+
+def _item(id, title, discount, site="amazon", url=None):
+    return {
+        "id": id,
+        "site": site,
+        "title": title,
+        "price_text": "49,990",
+        "original_price_text": "74,990",
+        "discount_percent": discount,
+        "discount_source": "scraped",
+        "url": url or f"https://www.amazon.in/dp/{id}?ref=sr_1_1",
+        "image": None,
+        "thumbnail": None,
+    }
+
+
+@pytest.fixture
+def subscribe(tmp_path, monkeypatch):
+    """POST /api/subscribe exactly as app/page.jsx does and return the stored alert."""
+    alerts_file = tmp_path / "alerts.json"
+    alerts_file.write_text("[]")
+    monkeypatch.setattr(app_module, "ALERTS_FILE", str(alerts_file))
+    client = app_module.app.test_client()
+
+    def _subscribe(product, discount="30%"):
+        resp = client.post("/api/subscribe", json={
+            "product": product,
+            "keyword": product["title"],  # watching?.title || q
+            "discount": discount,
+            "method": "Email",
+            "contact": "user@example.com",
+        })
+        assert resp.get_json()["success"]
+        return json.loads(alerts_file.read_text())
+
+    return _subscribe
+
+
+def test_product_alert_matches_its_product_on_any_keyword(subscribe):
+    watched = _item("B0WATCHED", "Acer Aspire 7 Gaming Laptop", 40.0)
+    alerts = subscribe(watched)
+
+    scraped = [
+        # same product, different tracking query string on this scrape
+        _item("B0WATCHED", "Acer Aspire 7 Gaming Laptop", 45.0,
+              url="https://www.amazon.in/dp/B0WATCHED?ref=sr_1_7"),
+        _item("B0OTHER", "HP Victus Laptop", 60.0),
+        _item("B0WATCHED", "Same id on another site", 70.0, site="flipkart"),
+    ]
+    entries = triggered_entries(alerts, "laptop", scraped)
+
+    assert len(entries) == 1
+    assert entries[0]["payload"]["title"] == "Acer Aspire 7 Gaming Laptop"
+    assert entries[0]["contact"] == "user@example.com"
+
+
+def test_product_alert_respects_threshold(subscribe):
+    alerts = subscribe(_item("B0WATCHED", "Acer Aspire 7", 40.0), discount="50%")
+    assert triggered_entries(alerts, "laptop", [_item("B0WATCHED", "Acer Aspire 7", 45.0)]) == []
+
+
+def test_product_alert_falls_back_to_url_without_id(subscribe):
+    product = _item(None, "Nykaa Matte Lipstick", 30.0, site="nykaa",
+                    url="https://www.nykaa.com/matte-lipstick/p/1234?productId=1234")
+    alerts = subscribe(product)
+    scraped = [dict(product, url="https://www.nykaa.com/matte-lipstick/p/1234?productId=1234&skuId=9")]
+    assert len(triggered_entries(alerts, "lipstick", scraped)) == 1
+
+
+def test_keyword_only_alert_matches_by_keyword():
+    alerts = [{"id": "a1", "keyword": "Laptop", "discount": "30", "method": "Email", "contact": "x@example.com"}]
+    items = [_item("B1", "One", 35.0), _item("B2", "Two", 10.0)]
+
+    assert len(triggered_entries(alerts, "laptop", items)) == 1
+    assert triggered_entries(alerts, "phone", items) == []
+
+
+def test_legacy_alerts_without_id_notify_each_contact(tmp_path):
+    alerts = [
+        {"keyword": "laptop", "threshold": 30, "method": "SMS", "contact": "+91 11111 11111", "active": True},
+        {"keyword": "laptop", "threshold": 30, "method": "SMS", "contact": "+91 22222 22222", "active": True},
+    ]
+    entries = triggered_entries(alerts, "laptop", [_item("B1", "One", 40.0)])
+
+    outbox = Outbox(str(tmp_path / "outbox.db"))
+    assert outbox.enqueue(entries) == 2
+    assert outbox.enqueue(triggered_entries(alerts, "laptop", [_item("B1", "One", 40.0)])) == 0
+
+
+# --------------------
+# SMTP sink
+# --------------------
+class FakeSMTP:
+    def __init__(self, fail=None):
+        self.fail = fail
+        self.sent = []
+        self.closed = False
+
+    def send_message(self, msg):
+        if self.fail is not None:
+            raise self.fail
+        self.sent.append(msg["To"])
+
+    def close(self):
+        self.closed = True
+
+
+def _sink(fresh):
+    sink = SMTPSink("smtp.invalid", 25, starttls=False)
+    sink._connect = lambda: fresh.pop(0)
+    return sink
+
+
+def _digest(contact="user@example.com"):
+    return build_digest(contact, [_item("B1", "One", 40.0)])
+
+
+def test_stale_pooled_connection_is_replaced():
+    stale = FakeSMTP(fail=smtplib.SMTPServerDisconnected("Connection unexpectedly closed"))
+    fresh = FakeSMTP()
+    sink = _sink([fresh])
+    sink._pool.put(stale)
+
+    sink.send(_digest())
+
+    assert stale.closed
+    assert fresh.sent == ["user@example.com"]
+    assert sink._pool.get_nowait() is fresh
+
+
+def test_refused_recipient_is_dead_lettered_at_once(tmp_path):
+    refused = FakeSMTP(fail=smtplib.SMTPRecipientsRefused({"bad@example.com": (550, b"no such user")}))
+    sink = _sink([refused])
+    with pytest.raises(PermanentDeliveryError):
+        sink.send(_digest("bad@example.com"))
+
+    outbox = Outbox(str(tmp_path / "outbox.db"))
+    outbox.enqueue([{"method": "Email", "contact": "bad@example.com",
+                     "payload": {"title": "x", "site": "amazon", "discount_percent": 40.0}}])
+    sink._pool.put(FakeSMTP(fail=refused.fail))
+    worker = DeliveryWorker(outbox, {"Email": sink}, rate=1e9, burst=10, max_attempts=5)
+    asyncio.run(worker.run_once())
+
+    assert outbox.stats()["dead"] == 1
+
+
+def test_locked_database_leaves_connection_usable(tmp_path):
+    path = str(tmp_path / "outbox.db")
+    outbox = Outbox(path)
+    outbox._db.execute("PRAGMA busy_timeout = 50")
+    other = sqlite3.connect(path, isolation_level=None)
+    other.execute("BEGIN IMMEDIATE")  # a second process holding the write lock
+
+    entry = {"method": "Email", "contact": "a@example.com", "payload": {"x": 1}}
+    with pytest.raises(sqlite3.OperationalError):
+        outbox.enqueue([entry])
+    assert not outbox._db.in_transaction
+
+    other.execute("ROLLBACK")
+    assert outbox.enqueue([entry]) == 1
+    assert len(outbox.claim()) == 1
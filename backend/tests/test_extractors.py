@@ -0,0 +1,204 @@
+import asyncio
+import re
+import sys
+import types
+
+import pytest
+
+pytest.importorskip("bs4")
+
+from session_state import session_store
+from sites import amazon, flipkart, nykaa
+
+
+# --------------------
+# Synthetic search pages, one card builder per site
+# --------------------
+def amazon_card(asin):
+    return (
+        f'<div class="s-result-item" data-component-type="s-search-result" data-asin="{asin}">'
+        f'<h2><a href="/dp/{asin}?ref=sr_1"><span>Laptop {asin} with a long enough title</span></a></h2>'
+        f'<img class="s-image" src="https://m.media-amazon.com/images/I/{asin}.jpg">'
+        f'<span class="a-price"><span class="a-offscreen">₹49,990</span></span>'
+        f'<span class="a-text-price"><span class="a-offscreen">₹74,990</span></span>'
+        f'<span class="savingsPercentage">-33%</span></div>'
+    )
+
+
+def flipkart_card(pid):
+    return (
+        f'<div data-id="{pid}"><a href="/laptop-{pid}/p/itm{pid}?pid={pid}&amp;lid=x">'
+        f'<img src="https://rukminim1.flixcart.com/image/{pid}.jpg">'
+        f'<div>Flipkart laptop {pid} 16 GB RAM</div><div>₹52,990</div><span>30% off</span></a></div>'
+    )
+
+
+def nykaa_card(pid):
+    return (
+        f'<div class="css-1rd7vky"><a href="/lipstick-{pid}/p/{pid}?productId={pid}&amp;pps=1">'
+        f'<img src="https://images-static.nykaa.com/{pid}.jpg">'
+        f'<div class="css-xrzmfa">Matte lipstick {pid}</div>'
+        f'<span class="css-17x46n5">MRP:₹999</span><span class="css-111z9ua">₹699</span>'
+        f'<span class="css-cjd9an">30% Off</span></a></div>'
+    )
+
+
+def page(*cards):
+    return "<html><body>" + "".join(cards) + "</body></html>"
+
+
+# --------------------
+# Offline twins
+# --------------------
+@pytest.mark.parametrize("module, card", [(amazon, amazon_card), (flipkart, flipkart_card), (nykaa, nykaa_card)])
+def test_duplicates_within_a_page_are_skipped(module, card):
+    extracted = module.extract_cards_html(page(card("101"), card("102"), card("101")))
+    assert [c["id"] for c in extracted["cards"]] == ["101", "102"]
+    assert extracted["skipped"] == 1
+
+
+@pytest.mark.parametrize("module, card", [(amazon, amazon_card), (flipkart, flipkart_card), (nykaa, nykaa_card)])
+def test_ids_seen_on_earlier_pages_are_skipped(module, card):
+    extracted = module.extract_cards_html(page(card("101"), card("103")), seen=["101", "102"])
+    assert [c["id"] for c in extracted["cards"]] == ["103"]
+    assert extracted["skipped"] == 1
+    row = module.parse_card(extracted["cards"][0])
+    assert row["ID"] == "103" and row["Title"]
+
+
+def test_flipkart_nested_containers_yield_one_card():
+    inner = flipkart_card("201")
+    nested = f'<div data-id="201"><div class="wrap">{inner}</div></div>'
+    extracted = flipkart.extract_cards_html(page(nested, flipkart_card("202")))
+
+    assert extracted["total"] == 3
+    assert [c["id"] for c in extracted["cards"]] == ["201", "202"]
+    assert extracted["skipped"] == 1
+    assert flipkart.parse_card(extracted["cards"][0])["Title"] == "Flipkart laptop 201 16 GB RAM"
+
+
+def test_flipkart_cards_without_a_price_are_not_duplicates():
+    extracted = flipkart.extract_cards_html(page('<div data-id="301"><a href="/x">no price</a></div>'))
+    assert extracted == {"total": 1, "skipped": 0, "cards": []}
+
+
+def test_nykaa_id_comes_from_the_path_without_a_query_id():
+    card = '<div class="css-1rd7vky"><a href="/kajal/p/401"><div class="css-xrzmfa">Kajal</div>' \
+           '<span class="css-111z9ua">₹199</span></a></div>'
+    assert nykaa.extract_cards_html(page(card))["cards"][0]["id"] == "401"
+
+
+# --------------------
+# Scraper loops: duplicates across pages reach stats["duplicates_skipped"]
+# --------------------
+class FakePage:
+    def __init__(self, module, pages):
+        self.module = module
+        self.pages = pages
+        self.html = ""
+
+    async def goto(self, url, **kw):
+        self.html = self.pages[int(re.search(r"page(?:_no)?=(\d+)", url).group(1))]
+
+    async def eval_on_selector_all(self, selector, js, arg):
+        if js is not self.module._EXTRACT_CARDS_JS:
+            return None  # scroll helpers
+        # the offline twin stands in for the in-page extractor
+        seen = arg["seen"] if isinstance(arg, dict) else arg
+        return self.module.extract_cards_html(self.html, seen)
+
+    async def content(self):
+        return self.html
+
+    async def click(self, selector, timeout=None):
+        raise TimeoutError(selector)
+
+    async def wait_for_selector(self, selector, timeout=None):
+        return None
+
+    async def wait_for_load_state(self, state=None):
+        return None
+
+    async def close(self):
+        return None
+
+    @property
+    def mouse(self):
+        async def wheel(x, y):
+            return None
+        return types.SimpleNamespace(wheel=wheel)
+
+
+def _fake_playwright(module, pages):
+    class Context:
+        async def new_page(self):
+            return FakePage(module, pages)
+
+        async def close(self):
+            return None
+
+    class Browser:
+        async def new_context(self, **kwargs):
+            return Context()
+
+        async def new_browser_cdp_session(self):
+            raise RuntimeError("no CDP in tests")
+
+        async def close(self):
+            return None
+
+    class Chromium:
+        async def launch(self, **kwargs):
+            return Browser()
+
+    class Playwright:
+        chromium = Chromium()
+
+        async def __aenter__(self):
+            return self
+
+        async def __aexit__(self, *exc):
+            return False
+
+    fake = types.ModuleType("playwright.async_api")
+    fake.async_playwright = Playwright
+    return fake
+
+
+@pytest.fixture
+def offline_scrape(monkeypatch):
+    async def no_wait(*args, **kwargs):
+        return None
+
+    async def fake_navigate(page, site, url, **kwargs):
+        await page.goto(url)
+
+    monkeypatch.setattr(session_store, "state_path", lambda site: None)
+    monkeypatch.setattr(session_store, "refresh_if_stale", no_wait)
+    monkeypatch.setattr(session_store, "record_page_ready", lambda *a, **k: None)
+    monkeypatch.setitem(sys.modules, "playwright", types.ModuleType("playwright"))
+
+    def run(module, pages, **kwargs):
+        monkeypatch.setitem(sys.modules, "playwright.async_api", _fake_playwright(module, pages))
+        monkeypatch.setattr(module, "navigate", fake_navigate)
+        monkeypatch.setattr(module, "archive_page", no_wait)
+        monkeypatch.setattr(module, "asyncio", types.SimpleNamespace(sleep=no_wait))
+        if hasattr(module, "get_user_agent"):
+            monkeypatch.setattr(module, "get_user_agent", lambda: "test-agent")
+        stats = {}
+        rows = asyncio.run(module.scrape(keyword="x", max_products=50, max_pages=len(pages), stats=stats))
+        return rows, stats
+
+    return run
+
+
+@pytest.mark.parametrize("module, card", [(amazon, amazon_card), (flipkart, flipkart_card), (nykaa, nykaa_card)])
+def test_scrape_counts_duplicates_across_pages(offline_scrape, module, card):
+    pages = {
+        1: page(card("101"), card("102"), card("101")),
+        2: page(card("102"), card("103")),
+    }
+    rows, stats = offline_scrape(module, pages)
+
+    assert [r["ID"] for r in rows] == ["101", "102", "103"]
+    assert stats["duplicates_skipped"] == 2
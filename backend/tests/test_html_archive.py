@@ -0,0 +1,89 @@
+import io
+import os
+import json
+
+import pytest
+
+import html_archive
+from html_archive import HtmlArchive, reextract
+
+NYKAA_PAGE = "<html><body>" + "".join(
+    f'<div class="css-1rd7vky"><a href="/lipstick-{i}/p/{100 + i}?productId={100 + i}">'
+    f'<img src="https://images-static.nykaa.com/{i}.jpg">'
+    f'<div class="css-xrzmfa">Matte Lipstick shade {i}</div>'
+    f'<span class="css-17x46n5">MRP:₹{900 + i}</span><span class="css-111z9ua">₹{600 + i}</span>'
+    f'<span class="css-cjd9an">33% Off</span></a></div>'
+    for i in range(5)
+) + "</body></html>"
+
+
+@pytest.fixture
+def archive(tmp_path):
+    return HtmlArchive(str(tmp_path), max_bytes=10 ** 9)
+
+
+def test_identical_pages_share_one_blob(archive):
+    for page in (1, 1, 2):
+        archive.store("nykaa", "lipstick", page, "https://www.nykaa.com/search", NYKAA_PAGE)
+    stats = archive.stats()
+    assert stats["blobs"] == 1
+    assert stats["sites"]["nykaa"]["captures"] == 3
+
+
+def test_capture_survives_eviction_between_check_and_insert(archive, monkeypatch):
+    archive.store("nykaa", "lipstick", 1, "u", NYKAA_PAGE)
+    other = NYKAA_PAGE.replace("Matte", "Glossy")
+    real_compress = html_archive.compress
+
+    def compress_then_evict(data, codec):
+        # another thread evicts everything while this one compresses outside the lock
+        archive.prune(0)
+        return real_compress(data, codec)
+
+    monkeypatch.setattr(html_archive, "compress", compress_then_evict)
+    archive.store("nykaa", "lipstick", 2, "u", other)
+
+    captures = archive.captures()
+    assert [c["page"] for c in captures] == [2]
+    assert "Glossy" in archive.load(captures[0]["digest"], captures[0]["codec"])
+
+
+def test_known_blob_deleted_on_disk_is_rewritten(archive):
+    digest = archive.store("nykaa", "lipstick", 1, "u", NYKAA_PAGE)
+    codec = archive.captures()[0]["codec"]
+    os.remove(archive.blob_path(digest, codec))
+
+    archive.store("nykaa", "lipstick", 2, "u", NYKAA_PAGE)
+    assert len(archive.captures()) == 2
+    assert archive.load(digest, codec) == NYKAA_PAGE
+
+
+def test_reextract_rebuilds_rows_offline(archive):
+    pytest.importorskip("bs4")
+    archive.store("nykaa", "lipstick", 1, "https://www.nykaa.com/search", NYKAA_PAGE)
+    archive.store("nykaa", "lipstick", 2, "https://www.nykaa.com/search", NYKAA_PAGE.replace("css-1rd7vky", "css-new"))
+
+    out = io.StringIO()
+    summary = reextract(archive, out, jobs=1)
+
+    rows = [json.loads(line) for line in out.getvalue().splitlines()]
+    assert len(rows) == 5
+    assert rows[0]["id"] == "100" and rows[0]["price_text"] == "600"
+    # the page whose card class changed shows up as an empty capture
+    assert summary["sites"]["nykaa"]["empty_captures"] == [2]
+
+
+def test_reextracted_rows_match_the_scrape_response(archive):
+    pytest.importorskip("bs4")
+    from app import normalize_row
+    from sites.nykaa import extract_cards_html, parse_card
+
+    archive.store("nykaa", "lipstick", 1, "https://www.nykaa.com/search", NYKAA_PAGE)
+    out = io.StringIO()
+    reextract(archive, out, jobs=1)
+
+    fields = ("id", "site", "title", "price_text", "discount_percent", "url", "image", "thumbnail")
+    rebuilt = [json.loads(line) for line in out.getvalue().splitlines()]
+    live = [normalize_row(parse_card(c)) for c in extract_cards_html(NYKAA_PAGE)["cards"]]
+    assert [{k: r[k] for k in fields} for r in rebuilt] == [{k: r[k] for k in fields} for r in live]
+    assert rebuilt[0]["thumbnail"].startswith("/api/image?url=")
@@ -0,0 +1,100 @@
+import json
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+import image_proxy
+from image_proxy import ImageProxy, ImageProxyError, ThumbnailCache
+
+
+class FakeResponse:
+    def __init__(self, status, headers=None, body=b""):
+        self.status_code = status
+        self.headers = headers or {}
+        self.body = body
+        self.is_redirect = status in (301, 302, 303, 307, 308) and "Location" in self.headers
+
+    def iter_content(self, size):
+        yield self.body
+
+    def close(self):
+        pass
+
+
+class FakeSession:
+    def __init__(self, responses):
+        self.responses = responses
+        self.requested = []
+
+    def get(self, url, allow_redirects=True, **kw):
+        assert allow_redirects is False
+        self.requested.append(url)
+        return self.responses[url]
+
+
+def _proxy(tmp_path, responses):
+    proxy = ImageProxy(cache=ThumbnailCache(str(tmp_path)))
+    proxy.session = FakeSession(responses)
+    return proxy
+
+
+def test_redirect_to_disallowed_host_is_refused(tmp_path):
+    proxy = _proxy(tmp_path, {
+        "https://www.amazon.in/redirect": FakeResponse(302, {"Location": "http://169.254.169.254/latest"}),
+    })
+    with pytest.raises(ImageProxyError):
+        proxy._fetch("https://www.amazon.in/redirect")
+    assert proxy.session.requested == ["https://www.amazon.in/redirect"]
+
+
+def test_redirect_within_allowlist_is_followed(tmp_path):
+    proxy = _proxy(tmp_path, {
+        "https://www.amazon.in/img": FakeResponse(301, {"Location": "https://m.media-amazon.com/images/I/1.jpg"}),
+        "https://m.media-amazon.com/images/I/1.jpg": FakeResponse(200, {"Content-Type": "image/jpeg"}, b"jpeg"),
+    })
+    assert proxy._fetch("https://www.amazon.in/img") == (b"jpeg", "image/jpeg")
+
+
+def test_eviction_skips_recently_used_blobs(tmp_path):
+    cache = ThumbnailCache(str(tmp_path), max_bytes=10)
+    old = cache.put("https://m.media-amazon.com/a.jpg", 320, b"a" * 8, "image/jpeg")
+    stale = time.time() - image_proxy.EVICT_GRACE_S - 5
+    os.utime(cache.blob_path(old["digest"]), (stale, stale))
+    recent = cache.put("https://m.media-amazon.com/b.jpg", 320, b"b" * 8, "image/jpeg")
+    third = cache.put("https://m.media-amazon.com/c.jpg", 320, b"c" * 8, "image/jpeg")
+
+    assert not os.path.exists(cache.blob_path(old["digest"]))
+    # over budget, but b was used within the grace window
+    assert os.path.exists(cache.blob_path(recent["digest"]))
+    assert os.path.exists(cache.blob_path(third["digest"]))
+
+
+def test_index_survives_reopen_and_imports_legacy_json(tmp_path):
+    cache = ThumbnailCache(str(tmp_path))
+    entry = cache.put("https://m.media-amazon.com/a.jpg", 320, b"a" * 8, "image/jpeg")
+    legacy = cache.put("https://m.media-amazon.com/b.jpg", 320, b"b" * 8, "image/jpeg")
+    cache._db.execute("DELETE FROM entries WHERE key LIKE '%b.jpg'")
+    cache._db.execute("DELETE FROM blobs WHERE digest = ?", (legacy["digest"],))
+    (tmp_path / "index.json").write_text(json.dumps({"320:https://m.media-amazon.com/b.jpg": legacy}))
+
+    reopened = ThumbnailCache(str(tmp_path))
+    assert reopened.get("https://m.media-amazon.com/a.jpg", 320) == entry
+    assert reopened.get("https://m.media-amazon.com/b.jpg", 320) == legacy
+    assert reopened.total_bytes == 16
+    assert not (tmp_path / "index.json").exists()
+
+
+def test_concurrent_misses_are_all_counted(tmp_path, monkeypatch):
+    body = b"jpeg"
+    urls = [f"https://m.media-amazon.com/{i}.jpg" for i in range(40)]
+    proxy = _proxy(tmp_path, {u: FakeResponse(200, {"Content-Type": "image/jpeg"}, body) for u in urls})
+    monkeypatch.setattr(image_proxy, "_make_thumbnail", lambda data, width: (data, None))
+    with ThreadPoolExecutor(8) as pool:
+        list(pool.map(proxy.get, urls * 2))
+
+    stats = proxy.stats_snapshot()
+    assert stats["hits"] + stats["misses"] + stats["coalesced"] == 80
+    assert stats["misses"] == 40 and stats["errors"] == 0
+    assert proxy.cache.total_bytes == len(body)  # 40 URLs, one shared blob
@@ -0,0 +1,130 @@
+import asyncio
+import os
+import tracemalloc
+
+import pytest
+
+import memory
+from memory import MB, MemoryCeilingExceeded, MemoryMonitor, PageRecycler
+
+
+class FakeCDP:
+    def __init__(self, pids):
+        self.pids = pids
+
+    async def send(self, method):
+        assert method == "SystemInfo.getProcessInfo"
+        return {"processInfo": [{"type": "browser", "id": pid, "cpuTime": 0} for pid in self.pids]}
+
+
+class FakeContext:
+    async def new_page(self):
+        return object()
+
+    async def close(self):
+        pass
+
+
+class FakeBrowser:
+    def __init__(self, pids=None):
+        self.pids = pids
+        self.contexts = 0
+
+    async def new_browser_cdp_session(self):
+        if self.pids is None:
+            raise RuntimeError("not chromium")
+        return FakeCDP(self.pids)
+
+    async def new_context(self, **kwargs):
+        self.contexts += 1
+        return FakeContext()
+
+
+def test_sample_counts_only_the_attached_browser():
+    async def run():
+        monitor = MemoryMonitor("site")
+        await monitor.attach(FakeBrowser([os.getpid()]))
+        return await monitor.sample()
+
+    assert asyncio.run(run()) > 0
+
+
+def test_without_cdp_sampling_reports_none_and_never_recycles():
+    async def run():
+        monitor = MemoryMonitor("site", ceiling_mb=1)
+        browser = FakeBrowser(None)
+        pages = PageRecycler(browser, monitor, max_pages=0, max_memory_mb=1)
+        await pages.before_page()
+        await pages.page_done()
+        await pages.before_page()
+        return monitor, browser
+
+    monitor, browser = asyncio.run(run())
+    assert browser.contexts == 1
+    assert monitor.finish()["browser_peak_mb"] is None
+
+
+def test_memory_threshold_and_ceiling_use_own_browser(monkeypatch):
+    usage = {101: 300 * MB, 202: 50 * MB}
+    monkeypatch.setattr(memory, "process_uss", lambda pid: usage.get(pid, 0))
+
+    async def run(pids, **kw):
+        browser = FakeBrowser(pids)
+        pages = PageRecycler(browser, MemoryMonitor("site", **kw), max_pages=0, max_memory_mb=200)
+        await pages.before_page()
+        await pages.page_done()
+        await pages.before_page()
+        return browser.contexts
+
+    assert asyncio.run(run([101])) == 2   # over 200 MB -> recycled
+    assert asyncio.run(run([202])) == 1   # another browser's usage is not ours
+    with pytest.raises(MemoryCeilingExceeded):
+        asyncio.run(run([101], ceiling_mb=100))
+
+
+def test_tracemalloc_runs_until_last_monitor_finishes(monkeypatch):
+    if tracemalloc.is_tracing():
+        pytest.skip("tracemalloc already enabled externally")
+    monkeypatch.setattr(memory, "TRACEMALLOC", True)
+
+    first, second = MemoryMonitor("a"), MemoryMonitor("b")
+    report = first.finish()
+    assert "py_heap_peak_mb" in report
+    assert tracemalloc.is_tracing()
+
+    second.finish()
+    assert not tracemalloc.is_tracing()
+
+
+@pytest.mark.parametrize("site", ["amazon", "flipkart", "nykaa"])
+def test_failed_launch_still_finishes_the_monitor(site, monkeypatch):
+    if tracemalloc.is_tracing():
+        pytest.skip("tracemalloc already enabled externally")
+    import importlib
+    import sys
+    import types
+
+    class Chromium:
+        async def launch(self, **kwargs):
+            raise RuntimeError("Executable doesn't exist")
+
+    class Playwright:
+        chromium = Chromium()
+
+        async def __aenter__(self):
+            return self
+
+        async def __aexit__(self, *exc):
+            return False
+
+    fake = types.ModuleType("playwright.async_api")
+    fake.async_playwright = Playwright
+    monkeypatch.setitem(sys.modules, "playwright", types.ModuleType("playwright"))
+    monkeypatch.setitem(sys.modules, "playwright.async_api", fake)
+    monkeypatch.setattr(memory, "TRACEMALLOC", True)
+    module = importlib.import_module(f"sites.{site}")
+
+    with pytest.raises(RuntimeError, match="Executable"):
+        asyncio.run(module.scrape(keyword="x"))
+    assert not tracemalloc.is_tracing()
+    assert memory.last_reports()[site]["items"] == 0
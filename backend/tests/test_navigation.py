@@ -0,0 +1,124 @@
+import asyncio
+
+import pytest
+
+import navigation
+from navigation import CircuitBreaker, CircuitOpenError, NavigationError
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    c = Clock()
+    monkeypatch.setattr(navigation.time, "monotonic", c)
+    return c
+
+
+def test_breaker_opens_after_threshold(clock):
+    b = CircuitBreaker("site", failure_threshold=3, reset_timeout=60)
+    for _ in range(2):
+        b.check()
+        b.record_failure("boom")
+    assert b.state == CircuitBreaker.CLOSED
+
+    b.check()
+    b.record_failure("boom")
+    assert b.state == CircuitBreaker.OPEN
+    with pytest.raises(CircuitOpenError):
+        b.check()
+    with pytest.raises(CircuitOpenError):
+        b.reject_if_open()
+
+
+def test_success_resets_failure_count(clock):
+    b = CircuitBreaker("site", failure_threshold=3)
+    b.record_failure("a")
+    b.record_failure("b")
+    b.record_success()
+    b.record_failure("c")
+    assert b.state == CircuitBreaker.CLOSED
+
+
+def test_half_open_allows_one_probe_then_closes(clock):
+    b = CircuitBreaker("site", failure_threshold=1, reset_timeout=60)
+    b.record_failure("boom")
+    clock.now += 61
+
+    b.reject_if_open()          # pre-flight does not claim the probe
+    assert b.state == CircuitBreaker.OPEN
+    b.check()                   # first caller becomes the probe
+    assert b.state == CircuitBreaker.HALF_OPEN
+    with pytest.raises(CircuitOpenError):
+        b.check()               # everyone else waits for its outcome
+
+    b.record_success()
+    assert b.state == CircuitBreaker.CLOSED
+    b.check()
+
+
+def test_failed_probe_reopens(clock):
+    b = CircuitBreaker("site", failure_threshold=3, reset_timeout=60)
+    for _ in range(3):
+        b.record_failure("boom")
+    clock.now += 61
+    b.check()
+    b.record_failure("still down")
+    assert b.state == CircuitBreaker.OPEN
+    with pytest.raises(CircuitOpenError):
+        b.check()
+
+
+def test_abandoned_probe_frees_the_slot(clock):
+    b = CircuitBreaker("site", failure_threshold=1, reset_timeout=60)
+    b.record_failure("boom")
+    clock.now += 61
+    b.check()
+    b.abandon()
+    b.check()
+    assert b.state == CircuitBreaker.HALF_OPEN
+
+
+# --------------------
+# navigate() with a stub page
+# --------------------
+class FakePlaywrightError(Exception):
+    pass
+
+
+class FailingPage:
+    url = "https://www.nykaa.com/p/1"
+
+    def __init__(self):
+        self.timeouts = []
+
+    async def goto(self, url, timeout, wait_until):
+        self.timeouts.append(timeout)
+        raise FakePlaywrightError("net::ERR_TIMED_OUT")
+
+
+@pytest.fixture
+def fresh_registry(monkeypatch):
+    monkeypatch.setattr(navigation, "_breakers", {})
+    monkeypatch.setattr(navigation, "_latency", {})
+    monkeypatch.setattr(navigation, "_playwright_error", lambda: FakePlaywrightError)
+
+
+def test_side_fetch_key_does_not_trip_search_breaker(fresh_registry):
+    page = FailingPage()
+    for _ in range(navigation.FAILURE_THRESHOLD + 1):
+        with pytest.raises(NavigationError):
+            asyncio.run(navigation.navigate(page, "nykaa:detail", page.url, max_attempts=1, timeout_ms=5000))
+
+    assert navigation.breaker_for("nykaa:detail").state == CircuitBreaker.OPEN
+    assert navigation.breaker_for("nykaa").state == CircuitBreaker.CLOSED
+    navigation.breaker_for("nykaa").check()
+    assert navigation.latency_for("nykaa").snapshot()["samples"] == 0
+    # fixed timeout instead of the adaptive one; the open breaker stopped the last call early
+    assert page.timeouts == [5000] * navigation.FAILURE_THRESHOLD
@@ -0,0 +1,31 @@
+import math
+
+from records import ProductBatch, ProductRecord, product_dict
+
+ROWS = [
+    {"site": "Amazon", "Title": "One", "Price": "1,299", "OriginalPrice": "1,999",
+     "DiscountPercent": "35% off", "URL": "https://www.amazon.in/dp/B1", "image": "https://m.media-amazon.com/1.jpg",
+     "id": "B1"},
+    {"site": "amazon", "Title": "Two", "Price": "", "DiscountPercent": None,
+     "URL": "https://www.amazon.in/dp/B2", "image": "https://m.media-amazon.com/1.jpg", "id": "B2"},
+]
+
+
+def test_product_dict_matches_record_shape():
+    thumb = lambda url: f"thumb:{url}"
+    for row in ROWS:
+        assert product_dict(row, thumbnail_fn=thumb) == ProductRecord.from_row(row, thumbnail_fn=thumb).to_dict()
+
+
+def test_batch_calls_thumbnail_fn_once_per_image():
+    calls = []
+
+    def thumb(url):
+        calls.append(url)
+        return f"thumb:{url}"
+
+    batch = ProductBatch.from_rows(ROWS * 50, thumbnail_fn=thumb)
+    assert calls == ["https://m.media-amazon.com/1.jpg"]
+    assert batch.thumbnail[-1] == "thumb:https://m.media-amazon.com/1.jpg"
+    assert batch.price_value[0] == 1299.0 and math.isnan(batch.price_value[1])
+    assert [d["discount_percent"] for d in batch.to_dicts()[:2]] == [35.0, None]
@@ -0,0 +1,22 @@
+import asyncio
+
+from session_state import SITE_POPUPS, SessionStore
+
+
+class FakeContext:
+    async def storage_state(self):
+        return {"cookies": [{"name": "sid"}], "origins": []}
+
+
+def test_known_popups_come_from_what_was_dismissed(tmp_path):
+    store = SessionStore(str(tmp_path))
+    assert store.known_popups("flipkart") == SITE_POPUPS["flipkart"][:1]
+
+    dismissed = [SITE_POPUPS["flipkart"][1]]
+    asyncio.run(store.save("flipkart", FakeContext(), dismissed))
+    assert store.known_popups("flipkart") == dismissed
+    assert store.state_path("flipkart") is not None
+
+    store.invalidate("flipkart")
+    assert store.state_path("flipkart") is None
+    assert store.known_popups("flipkart") == SITE_POPUPS["flipkart"][:1]